@@ -43,6 +43,9 @@ DEFAULT_TIMEOUT_MINUTES = 25
 router = APIRouter(prefix="/api/v1/plans", tags=["runs"])
 stream_router = APIRouter(prefix="/api/v1/runs", tags=["runs"])
 
+# Strong references to in-flight run tasks; the event loop only keeps weak ones.
+_background_runs: set[asyncio.Task] = set()
+
 
 async def _persist_artifacts(storage, run_id: str, result: NotebookRunResult) -> None:
     storage.store_text(
@@ -268,7 +271,9 @@ async def start_run(
     )
 
     run_stream_manager.register(run_id)
-    asyncio.create_task(_run_plan(plan_record, run_id, db, storage))
+    task = asyncio.create_task(_run_plan(plan_record, run_id, db, storage))
+    _background_runs.add(task)
+    task.add_done_callback(_background_runs.discard)
     return {"run_id": run_id}
 
 
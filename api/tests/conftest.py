@@ -2,6 +2,8 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
@@ -10,3 +12,31 @@ os.environ.setdefault("ALLOW_MISSING_SUPABASE", "true")
 os.environ.setdefault("OPENAI_API_KEY", "sk-test-dummy-key-for-testing")
 os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
 os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-service-role-key")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "e2e: full FastAPI route tests driven through a test client")
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient for the whole session; per-test state lives in dependency overrides."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def _restore_dependency_overrides():
+    """Put app.dependency_overrides back exactly as the test found it."""
+    main = sys.modules.get("app.main")
+    snapshot = dict(main.app.dependency_overrides) if main is not None else {}
+    yield
+    main = sys.modules.get("app.main")
+    if main is not None:
+        overrides = main.app.dependency_overrides
+        overrides.clear()
+        overrides.update(snapshot)
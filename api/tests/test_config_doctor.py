@@ -8,6 +8,8 @@ from fastapi.testclient import TestClient
 from app.main import app
 from app.config.settings import get_settings
 
+pytestmark = pytest.mark.e2e
+
 
 @pytest.fixture(autouse=True)
 def reset_settings_cache():
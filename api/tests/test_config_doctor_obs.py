@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
+import pytest
 from fastapi.testclient import TestClient
 
 from app.config.doctor import config_snapshot
 from app.main import app
 from app.utils.redaction import redact_api_key, redact_signed_url
 
+pytestmark = pytest.mark.e2e
+
 
 def test_doctor_includes_runner_posture_and_last_run_snapshot():
     """Test that doctor endpoint includes runner config and last run info."""
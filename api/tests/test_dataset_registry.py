@@ -9,6 +9,8 @@ Tests cover:
 - Registry helpers
 """
 
+from types import MappingProxyType
+
 import pytest
 
 from app.materialize.generators.dataset_registry import (
@@ -22,6 +24,12 @@ from app.materialize.generators.dataset_registry import (
 )
 
 
+@pytest.fixture(scope="session")
+def dataset_registry():
+    """Read-only view of the registry shared across the session."""
+    return MappingProxyType(DATASET_REGISTRY)
+
+
 class TestNormalization:
     """Test dataset name normalization."""
 
@@ -95,71 +103,45 @@ class TestLookupExactMatch:
         assert meta.supports_streaming is True
 
 
-class TestLookupAliases:
-    """Test alias matching."""
-
-    def test_sst2_hyphenated_alias(self):
-        """SST-2 with hyphen should match via alias."""
-        meta = lookup_dataset("sst-2")
-        assert meta is not None
-        assert meta.source == DatasetSource.HUGGINGFACE
-        assert meta.hf_path == ("glue", "sst2")
-
-    def test_sst2_glue_path_alias(self):
-        """glue/sst2 should match via alias."""
-        meta = lookup_dataset("glue/sst2")
-        assert meta is not None
-        assert meta.hf_path == ("glue", "sst2")
-
-    def test_sst2_underscore_alias(self):
-        """sst_2 should match via alias."""
-        meta = lookup_dataset("sst_2")
-        assert meta is not None
-        assert meta.hf_path == ("glue", "sst2")
-
-    def test_digits_sklearn_prefix_alias(self):
-        """sklearn_digits should match via alias."""
-        meta = lookup_dataset("sklearn_digits")
-        assert meta is not None
-        assert meta.load_function == "load_digits"
-
-
-class TestLookupCaseInsensitive:
-    """Test case-insensitive matching."""
-
-    def test_uppercase(self):
-        """Uppercase names should match."""
-        assert lookup_dataset("MNIST") is not None
-        assert lookup_dataset("SST2") is not None
-        assert lookup_dataset("DIGITS") is not None
-
-    def test_mixed_case(self):
-        """Mixed case should match."""
-        assert lookup_dataset("MnIsT") is not None
-        assert lookup_dataset("Sst2") is not None
-
-    def test_alias_case_insensitive(self):
-        """Aliases should be case-insensitive."""
-        assert lookup_dataset("SST-2") is not None
-        assert lookup_dataset("Glue/SST2") is not None
-
-
-class TestLookupNotFound:
-    """Test lookup behavior for unknown datasets."""
-
-    def test_unknown_dataset_returns_none(self):
-        """Unknown dataset should return None."""
-        assert lookup_dataset("unknown_dataset") is None
-        assert lookup_dataset("does_not_exist") is None
-        assert lookup_dataset("cifar10") is None  # Not in Phase 2 registry yet
-
-    def test_empty_string_returns_none(self):
-        """Empty string should return None."""
-        assert lookup_dataset("") is None
-
-    def test_whitespace_only_returns_none(self):
-        """Whitespace-only should return None."""
-        assert lookup_dataset("   ") is None
+class TestLookupResolution:
+    """Test alias, case-insensitive and not-found resolution."""
+
+    @pytest.mark.parametrize(
+        "name,canonical",
+        [
+            # Aliases
+            ("sst-2", "sst2"),
+            ("glue/sst2", "sst2"),
+            ("sst_2", "sst2"),
+            ("sklearn_digits", "digits"),
+            # Case-insensitive names
+            ("MNIST", "mnist"),
+            ("SST2", "sst2"),
+            ("DIGITS", "digits"),
+            ("MnIsT", "mnist"),
+            ("Sst2", "sst2"),
+            # Case-insensitive aliases
+            ("SST-2", "sst2"),
+            ("Glue/SST2", "sst2"),
+        ],
+    )
+    def test_resolves_to_registry_entry(self, dataset_registry, name, canonical):
+        """Aliases and any casing resolve to the canonical registry entry."""
+        assert lookup_dataset(name) is dataset_registry[canonical]
+
+    @pytest.mark.parametrize(
+        "name",
+        [
+            "unknown_dataset",
+            "does_not_exist",
+            "cifar10",  # Not in Phase 2 registry yet
+            "",
+            "   ",
+        ],
+    )
+    def test_unknown_returns_none(self, name):
+        """Unknown, empty and whitespace-only names return None."""
+        assert lookup_dataset(name) is None
 
 
 class TestRegistryHelpers:
@@ -259,12 +241,12 @@ class TestAliasSymmetry:
 class TestRegistryIntegrity:
     """Test overall registry integrity."""
 
-    def test_no_duplicate_aliases(self):
+    def test_no_duplicate_aliases(self, dataset_registry):
         """No alias should point to multiple datasets."""
         # Build map of normalized name -> dataset primary key
         name_to_dataset = {}
 
-        for name, meta in DATASET_REGISTRY.items():
+        for name, meta in dataset_registry.items():
             # Track primary name
             normalized = normalize_dataset_name(name)
             if normalized in name_to_dataset:
@@ -277,31 +259,31 @@ class TestRegistryIntegrity:
                     pytest.fail(f"Alias conflict: {alias} points to both {name} and {name_to_dataset[alias]}")
                 name_to_dataset[alias] = name
 
-    def test_all_hf_datasets_have_hf_path(self):
+    def test_all_hf_datasets_have_hf_path(self, dataset_registry):
         """HuggingFace datasets must have hf_path."""
-        for name, meta in DATASET_REGISTRY.items():
+        for name, meta in dataset_registry.items():
             if meta.source == DatasetSource.HUGGINGFACE:
                 assert (
                     meta.hf_path is not None
                 ), f"HF dataset {name} missing hf_path"
                 assert len(meta.hf_path) > 0, f"HF dataset {name} has empty hf_path"
 
-    def test_non_hf_datasets_no_hf_path(self):
+    def test_non_hf_datasets_no_hf_path(self, dataset_registry):
         """Non-HuggingFace datasets should not have hf_path."""
-        for name, meta in DATASET_REGISTRY.items():
+        for name, meta in dataset_registry.items():
             if meta.source != DatasetSource.HUGGINGFACE:
                 assert meta.hf_path is None, f"Non-HF dataset {name} has hf_path"
 
-    def test_all_sizes_positive(self):
+    def test_all_sizes_positive(self, dataset_registry):
         """All dataset sizes should be positive."""
-        for name, meta in DATASET_REGISTRY.items():
+        for name, meta in dataset_registry.items():
             assert (
                 meta.typical_size_mb > 0
             ), f"Dataset {name} has invalid size: {meta.typical_size_mb}"
 
-    def test_streaming_only_for_hf(self):
+    def test_streaming_only_for_hf(self, dataset_registry):
         """Only HuggingFace datasets can support streaming."""
-        for name, meta in DATASET_REGISTRY.items():
+        for name, meta in dataset_registry.items():
             if meta.supports_streaming:
                 assert (
                     meta.source == DatasetSource.HUGGINGFACE
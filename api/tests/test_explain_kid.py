@@ -5,11 +5,12 @@ from datetime import datetime, timezone
 from typing import Any, Dict
 
 import pytest
-from fastapi.testclient import TestClient
 
 from app import dependencies
 from app.main import app
 
+pytestmark = pytest.mark.e2e
+
 
 class FakePaper:
     def __init__(self, paper_id: str, title: str) -> None:
@@ -111,15 +112,6 @@ def _override_deps(db: FakeKidDB, storage: FakeKidStorage):
     app.dependency_overrides[dependencies.get_supabase_storage] = lambda: storage
 
 
-@pytest.fixture
-def client():
-    client = TestClient(app)
-    try:
-        yield client
-    finally:
-        app.dependency_overrides.clear()
-
-
 def test_story_create_happy_returns_id_and_signed_url(client, monkeypatch):
     """Test successful storyboard creation with valid pages and alt-text."""
     db = FakeKidDB()
@@ -10,6 +10,8 @@ from fastapi.testclient import TestClient
 from app.data.models import StorageArtifact
 from app.main import app
 
+pytestmark = pytest.mark.e2e
+
 
 class FakeStorage:
     def __init__(self) -> None:
@@ -57,8 +59,7 @@ def override_internal_dependencies():
 
     app.dependency_overrides[dependencies.get_supabase_storage] = lambda: storage
     app.dependency_overrides[dependencies.get_supabase_db] = lambda: db
-    yield storage, db
-    app.dependency_overrides.clear()
+    return storage, db
 
 
 def test_signed_url_endpoint():
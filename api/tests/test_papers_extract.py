@@ -19,6 +19,8 @@ from app.routers.papers import (
     TOKEN_EVENT_TYPE,
 )
 
+pytestmark = pytest.mark.e2e
+
 
 class FakePaperDB:
     def __init__(self, paper: PaperRecord) -> None:
@@ -125,9 +127,7 @@ def extractor_setup(monkeypatch):
     app.dependency_overrides[dependencies.get_supabase_db] = lambda: fake_db
     app.dependency_overrides[dependencies.get_tool_tracker] = lambda: ToolUsageTracker()
 
-    yield {"paper": paper, "db": fake_db}
-
-    app.dependency_overrides.clear()
+    return {"paper": paper, "db": fake_db}
 
 
 def test_extractor_stream_happy_path(extractor_setup, monkeypatch):
@@ -266,8 +266,6 @@ def test_extractor_policy_cap_error(monkeypatch):
     with client.stream("POST", "/api/v1/papers/paper-1/extract") as response:
         sse_events = _collect_sse_events(response)
 
-    app.dependency_overrides.clear()
-
     assert sse_events[-1]["event"] == "error"
     assert sse_events[-1]["data"]["code"] == "E_POLICY_CAP_EXCEEDED"
     assert not any(event["data"].get("stage") == "extract_complete" for event in sse_events if event["event"] == "stage_update")
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from typing import Dict
-from uuid import uuid4
 
 import pytest
 from fastapi.testclient import TestClient
@@ -12,6 +11,11 @@ from app.data import PaperCreate, PaperRecord, StorageArtifact
 from app.main import app
 import app.routers.papers as papers_router
 
+pytestmark = pytest.mark.e2e
+
+
+_VALID_CREATED_BY = "123e4567-e89b-12d3-a456-426614174000"
+
 
 class FakeSupabaseDB:
     def __init__(self) -> None:
@@ -75,6 +79,30 @@ class FakeFileSearch:
         return vector_store_id in self.vector_stores
 
 
+class DummyResponse:
+    def __init__(self, status_code: int = 404) -> None:
+        self.status_code = status_code
+        self.headers = {"content-type": "text/html"}
+        self.content = b""
+
+
+_NOT_FOUND_RESPONSE = DummyResponse()
+
+
+class DummyClient:
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    async def __aenter__(self) -> "DummyClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    async def get(self, url: str) -> DummyResponse:
+        return _NOT_FOUND_RESPONSE
+
+
 @pytest.fixture(autouse=True)
 def override_dependencies():
     fake_db = FakeSupabaseDB()
@@ -88,9 +116,7 @@ def override_dependencies():
     app.dependency_overrides[dependencies.get_file_search_service] = lambda: fake_search
     app.dependency_overrides[dependencies.get_tool_tracker] = lambda: ToolUsageTracker()
 
-    yield {"db": fake_db, "storage": fake_storage, "search": fake_search}
-
-    app.dependency_overrides.clear()
+    return {"db": fake_db, "storage": fake_storage, "search": fake_search}
 
 
 def test_ingest_paper_via_upload():
@@ -133,25 +159,6 @@ def test_ingest_idempotent_returns_same_paper_id():
 
 
 def test_ingest_bad_url_returns_typed_error(monkeypatch):
-    class DummyResponse:
-        def __init__(self, status_code: int = 404) -> None:
-            self.status_code = status_code
-            self.headers = {"content-type": "text/html"}
-            self.content = b""
-
-    class DummyClient:
-        def __init__(self, *args, **kwargs) -> None:
-            pass
-
-        async def __aenter__(self) -> "DummyClient":
-            return self
-
-        async def __aexit__(self, exc_type, exc, tb) -> None:
-            return None
-
-        async def get(self, url: str) -> DummyResponse:
-            return DummyResponse()
-
     monkeypatch.setattr(papers_router.httpx, "AsyncClient", DummyClient)
 
     client = TestClient(app)
@@ -205,13 +212,12 @@ def test_ingest_created_by_invalid_omitted(override_dependencies):
 def test_ingest_created_by_good_uuid(override_dependencies):
     client = TestClient(app)
     payload = {"file": ("paper.pdf", b"%PDF-1.4 mock", "application/pdf")}
-    created_by = str(uuid4())
     response = client.post(
         "/api/v1/papers/ingest",
         files=payload,
-        data={"created_by": created_by},
+        data={"created_by": _VALID_CREATED_BY},
     )
     assert response.status_code == 201
     paper_id = response.json()["paper_id"]
     record = override_dependencies["db"].records[paper_id]
-    assert record.created_by == created_by
+    assert record.created_by == _VALID_CREATED_BY
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime, timezone
 from typing import Any, Iterator, List
 from uuid import UUID
@@ -30,6 +31,27 @@ from app.routers.plans import (
 )
 from app.tools.errors import ToolUsagePolicyError
 
+pytestmark = pytest.mark.e2e
+
+
+_JSON_HEADERS = {"content-type": "application/json"}
+_PLAN_REQUEST_BODY = json.dumps(
+    {
+        "claims": [
+            {
+                "dataset": "CIFAR-10",
+                "split": "test",
+                "metric": "accuracy",
+                "value": 0.85,
+                "units": "percent",
+                "citation": "p.3",
+                "confidence": 0.9,
+            }
+        ],
+        "budget_minutes": 15,
+    }
+).encode("utf-8")
+
 
 class FakePaperDB:
     def __init__(self, paper: PaperRecord) -> None:
@@ -43,7 +65,8 @@ class FakePaperDB:
 
     def insert_plan(self, payload: PlanCreate) -> PlanRecord:
         self.inserted_plan = payload
-        return PlanRecord.model_validate(payload.model_dump(mode="json"))
+        # Fake-only: payload is already validated, so build the record without re-validating it.
+        return PlanRecord.model_construct(**payload.model_dump())
 
 
 class FakeEvent:
@@ -109,17 +132,21 @@ def _paper_record() -> PaperRecord:
     )
 
 
+@pytest.fixture(scope="session")
+def canonical_paper() -> PaperRecord:
+    """Validated once per session; use model_copy(update=...) for variations."""
+    return _paper_record()
+
+
 @pytest.fixture
-def planner_setup(monkeypatch):
-    paper = _paper_record()
+def planner_setup(monkeypatch, canonical_paper):
+    paper = canonical_paper
     fake_db = FakePaperDB(paper)
 
     app.dependency_overrides[dependencies.get_supabase_db] = lambda: fake_db
     app.dependency_overrides[dependencies.get_tool_tracker] = lambda: ToolUsageTracker()
 
-    yield {"paper": paper, "db": fake_db}
-
-    app.dependency_overrides.clear()
+    return {"paper": paper, "db": fake_db}
 
 
 def _planner_output() -> PlannerOutput:
@@ -161,21 +188,7 @@ def test_planner_creates_plan(monkeypatch, planner_setup):
     monkeypatch.setattr(plans_router, "get_client", lambda: fake_client)
 
     client = TestClient(app)
-    request_body = {
-        "claims": [
-            {
-                "dataset": "CIFAR-10",
-                "split": "test",
-                "metric": "accuracy",
-                "value": 0.85,
-                "units": "percent",
-                "citation": "p.3",
-                "confidence": 0.9,
-            }
-        ],
-        "budget_minutes": 15,
-    }
-    response = client.post(f"/api/v1/papers/{planner_setup['paper'].id}/plan", json=request_body)
+    response = client.post(f"/api/v1/papers/{planner_setup['paper'].id}/plan", content=_PLAN_REQUEST_BODY, headers=_JSON_HEADERS)
     assert response.status_code == 200
 
     payload = response.json()
@@ -236,21 +249,7 @@ def test_planner_schema_validation_error(monkeypatch, planner_setup):
     monkeypatch.setattr(plans_router, "get_client", lambda: fake_client)
 
     client = TestClient(app)
-    request_body = {
-        "claims": [
-            {
-                "dataset": "CIFAR-10",
-                "split": "test",
-                "metric": "accuracy",
-                "value": 0.85,
-                "units": "percent",
-                "citation": "p.3",
-                "confidence": 0.9,
-            }
-        ],
-        "budget_minutes": 15,
-    }
-    response = client.post(f"/api/v1/papers/{planner_setup['paper'].id}/plan", json=request_body)
+    response = client.post(f"/api/v1/papers/{planner_setup['paper'].id}/plan", content=_PLAN_REQUEST_BODY, headers=_JSON_HEADERS)
     assert response.status_code == 400
     detail = response.json()["detail"]
     assert detail["code"] == ERROR_PLAN_SCHEMA_INVALID
@@ -258,9 +257,15 @@ def test_planner_schema_validation_error(monkeypatch, planner_setup):
     assert planner_setup["db"].inserted_plan is None
 
 
+_POLICY_CAP_MESSAGE = "file_search exceeded per-run cap of 10 invocations"
+
+
 class ExplodingTracker(ToolUsageTracker):
     def record_call(self, tool_name: str, seconds: float | None = None) -> None:
-        raise ToolUsagePolicyError("file_search exceeded per-run cap of 10 invocations")
+        raise ToolUsagePolicyError(_POLICY_CAP_MESSAGE)
+
+
+_EXPLODING_TRACKER = ExplodingTracker()
 
 
 def test_planner_policy_cap_error(monkeypatch, planner_setup):
@@ -272,27 +277,11 @@ def test_planner_policy_cap_error(monkeypatch, planner_setup):
     fake_client = FakeClient(events, FakeResponseWrapper(plan_output))
     monkeypatch.setattr(plans_router, "get_client", lambda: fake_client)
 
-    app.dependency_overrides[dependencies.get_tool_tracker] = lambda: ExplodingTracker()
+    app.dependency_overrides[dependencies.get_tool_tracker] = lambda: _EXPLODING_TRACKER
 
     client = TestClient(app)
-    request_body = {
-        "claims": [
-            {
-                "dataset": "CIFAR-10",
-                "split": "test",
-                "metric": "accuracy",
-                "value": 0.85,
-                "units": "percent",
-                "citation": "p.3",
-                "confidence": 0.9,
-            }
-        ],
-        "budget_minutes": 15,
-    }
-    response = client.post(f"/api/v1/papers/{planner_setup['paper'].id}/plan", json=request_body)
+    response = client.post(f"/api/v1/papers/{planner_setup['paper'].id}/plan", content=_PLAN_REQUEST_BODY, headers=_JSON_HEADERS)
     assert response.status_code == 429
     detail = response.json()["detail"]
     assert detail["code"] == POLICY_CAP_CODE
 
-    app.dependency_overrides.pop(dependencies.get_tool_tracker, None)
-
@@ -2,85 +2,103 @@ from __future__ import annotations
 
 import hashlib
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 from typing import Any, Dict
 
-import nbformat
 import pytest
-from fastapi.testclient import TestClient
 
 from app import dependencies
-from app.data.models import PlanCreate, PlanRecord, StorageArtifact
+from app.data.models import PlanRecord, StorageArtifact
 from app.main import app
 
-
-def _plan_json() -> Dict[str, Any]:
-    return {
-        "version": "1.1",
-        "dataset": {
-            "name": "CIFAR-10",
+pytestmark = pytest.mark.e2e
+
+
+_PLAN_JSON_TEMPLATE: Dict[str, Any] = {
+    "version": "1.1",
+    "dataset": {
+        "name": "CIFAR-10",
+        "split": "test",
+        "filters": [],
+        "notes": None,
+    },
+    "model": {
+        "name": "ResNet-18",
+        "variant": "tiny",
+        "parameters": {"learning_rate": 0.001},
+        "size_category": "tiny",
+    },
+    "config": {
+        "framework": "torch",
+        "seed": 42,
+        "epochs": 5,
+        "batch_size": 32,
+        "learning_rate": 0.001,
+        "optimizer": "adam",
+    },
+    "metrics": [
+        {
+            "name": "accuracy",
             "split": "test",
-            "filters": [],
-            "notes": None,
-        },
-        "model": {
-            "name": "ResNet-18",
-            "variant": "tiny",
-            "parameters": {"learning_rate": 0.001},
-            "size_category": "tiny",
-        },
-        "config": {
-            "framework": "torch",
-            "seed": 42,
-            "epochs": 5,
-            "batch_size": 32,
-            "learning_rate": 0.001,
-            "optimizer": "adam",
-        },
-        "metrics": [
-            {
-                "name": "accuracy",
-                "split": "test",
-                "goal": 0.9,
-                "tolerance": 0.02,
-                "direction": "maximize",
-            }
-        ],
-        "visualizations": ["confusion_matrix"],
-        "explain": ["Summarize the experiment for engineers"],
-        "justifications": {
-            "dataset": {"quote": "We evaluate on CIFAR-10", "citation": "p.3"},
-            "model": {"quote": "ResNet-18 baseline", "citation": "p.4"},
-            "config": {"quote": "Batch size 32", "citation": "p.5"},
-        },
-        "estimated_runtime_minutes": 12.0,
-        "license_compliant": True,
-        "policy": {"budget_minutes": 15, "max_retries": 1},
-    }
-
-
+            "goal": 0.9,
+            "tolerance": 0.02,
+            "direction": "maximize",
+        }
+    ],
+    "visualizations": ["confusion_matrix"],
+    "explain": ["Summarize the experiment for engineers"],
+    "justifications": {
+        "dataset": {"quote": "We evaluate on CIFAR-10", "citation": "p.3"},
+        "model": {"quote": "ResNet-18 baseline", "citation": "p.4"},
+        "config": {"quote": "Batch size 32", "citation": "p.5"},
+    },
+    "estimated_runtime_minutes": 12.0,
+    "license_compliant": True,
+    "policy": {"budget_minutes": 15, "max_retries": 1},
+}
+
+# Pins expected for the template plan: the defaults plus torch for its framework.
+_EXPECTED_REQUIREMENTS = sorted(
+    [
+        "numpy==1.26.4",
+        "scikit-learn==1.5.1",
+        "pandas==2.2.2",
+        "matplotlib==3.9.0",
+        "torch==2.2.2",
+        "torchvision==0.17.2",
+    ]
+)
+_EXPECTED_ENV_HASH = hashlib.sha256("\n".join(_EXPECTED_REQUIREMENTS).encode("utf-8")).hexdigest()
+
+_FIXED_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+_PLAN_RECORD_TEMPLATE = PlanRecord(
+    id="__template__",
+    paper_id="paper-123",
+    version="1.1",
+    plan_json=_PLAN_JSON_TEMPLATE,
+    env_hash=None,
+    budget_minutes=15,
+    status="draft",
+    created_by=None,
+    created_at=_FIXED_NOW,
+    updated_at=_FIXED_NOW,
+)
+
+
+# Fakes only ever model_copy() the record, so the cached instance stays pristine.
+@lru_cache(maxsize=None)
 def _plan_record(plan_id: str) -> PlanRecord:
-    payload = PlanCreate(
-        id=plan_id,
-        paper_id="paper-123",
-        version="1.1",
-        plan_json=_plan_json(),
-        env_hash=None,
-        budget_minutes=15,
-        status="draft",
-        created_by=None,
-        created_at=datetime.now(timezone.utc),
-        updated_at=datetime.now(timezone.utc),
-    )
-    return PlanRecord.model_validate(payload.model_dump(mode="json"))
+    return _PLAN_RECORD_TEMPLATE.model_copy(update={"id": plan_id})
 
 
 class FakeStorage:
     def __init__(self) -> None:
-        self.assets: Dict[str, Dict[str, Any]] = {}
+        self.assets: Dict[str, bytes] = {}
         self.signed_count = 0
 
     def store_asset(self, key: str, data: bytes, content_type: str) -> StorageArtifact:
-        self.assets[key] = {"data": data, "content_type": content_type}
+        self.assets[key] = data
         return StorageArtifact(bucket="plans", path=key)
 
     def store_text(self, key: str, text: str, content_type: str = "text/plain") -> StorageArtifact:
@@ -91,7 +109,7 @@ class FakeStorage:
 
     def create_signed_url(self, key: str, expires_in: int = 120) -> StorageArtifact:
         self.signed_count += 1
-        expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        expires_at = _FIXED_NOW + timedelta(seconds=expires_in)
         return StorageArtifact(
             bucket="plans",
             path=key,
@@ -117,30 +135,33 @@ class FakePlanDB:
         self.updated_hashes.append(env_hash)
         if not self.record:
             raise RuntimeError("Plan not available")
-        updated = self.record.model_copy(update={"env_hash": env_hash, "updated_at": datetime.now(timezone.utc)})
+        updated = self.record.model_copy(update={"env_hash": env_hash, "updated_at": _FIXED_NOW})
         self.record = updated
         return updated
 
 
+@pytest.fixture(scope="module")
+def _shared_storage() -> FakeStorage:
+    return FakeStorage()
+
+
 @pytest.fixture
-def test_client():
-    client = TestClient(app)
-    try:
-        yield client
-    finally:
-        app.dependency_overrides.clear()
+def fake_storage(_shared_storage: FakeStorage):
+    """Module-wide FakeStorage, emptied after each test."""
+    yield _shared_storage
+    _shared_storage.assets.clear()
+    _shared_storage.signed_count = 0
 
 
-def test_materialize_plan_persists_assets(test_client):
+def test_materialize_plan_persists_assets(client, fake_storage):
     plan_id = "plan-abc"
     plan_record = _plan_record(plan_id)
     fake_db = FakePlanDB(plan_record)
-    fake_storage = FakeStorage()
 
     app.dependency_overrides[dependencies.get_supabase_db] = lambda: fake_db
     app.dependency_overrides[dependencies.get_supabase_storage] = lambda: fake_storage
 
-    response = test_client.post(f"/api/v1/plans/{plan_id}/materialize")
+    response = client.post(f"/api/v1/plans/{plan_id}/materialize")
     assert response.status_code == 200
     payload = response.json()
 
@@ -152,32 +173,30 @@ def test_materialize_plan_persists_assets(test_client):
     assert notebook_key in fake_storage.assets
     assert env_key in fake_storage.assets
 
-    notebook_bytes = fake_storage.assets[notebook_key]["data"]
-    nb = nbformat.reads(notebook_bytes.decode("utf-8"), as_version=4)
-    assert any("log_event" in cell.get("source", "") for cell in nb.cells if cell["cell_type"] == "code")
+    notebook_bytes = fake_storage.assets[notebook_key]
+    assert b"log_event" in notebook_bytes
 
-    requirements_bytes = fake_storage.assets[env_key]["data"]
+    requirements_bytes = fake_storage.assets[env_key]
     requirements_text = requirements_bytes.decode("utf-8").strip().splitlines()
-    expected_hash = hashlib.sha256("\n".join(sorted(line.strip() for line in requirements_text if line)).encode("utf-8")).hexdigest()
-    assert payload["env_hash"] == expected_hash
-    assert fake_db.updated_hashes[-1] == expected_hash
+    assert sorted(line.strip() for line in requirements_text if line) == _EXPECTED_REQUIREMENTS
+    assert payload["env_hash"] == _EXPECTED_ENV_HASH
+    assert fake_db.updated_hashes[-1] == _EXPECTED_ENV_HASH
 
 
-def test_materialize_plan_missing_plan_returns_404(test_client):
+def test_materialize_plan_missing_plan_returns_404(client, fake_storage):
     app.dependency_overrides[dependencies.get_supabase_db] = lambda: FakePlanDB(None)
-    app.dependency_overrides[dependencies.get_supabase_storage] = lambda: FakeStorage()
+    app.dependency_overrides[dependencies.get_supabase_storage] = lambda: fake_storage
 
-    response = test_client.post("/api/v1/plans/missing/materialize")
+    response = client.post("/api/v1/plans/missing/materialize")
     assert response.status_code == 404
     detail = response.json()["detail"]
     assert detail["code"] == "E_PLAN_NOT_FOUND"
 
 
-def test_plan_assets_returns_signed_urls(test_client):
+def test_plan_assets_returns_signed_urls(client, fake_storage):
     plan_id = "plan-assets"
     plan_record = _plan_record(plan_id)
     fake_db = FakePlanDB(plan_record)
-    fake_storage = FakeStorage()
 
     # Pretend assets already exist
     fake_storage.store_asset(f"plans/{plan_id}/notebook.ipynb", b"nb", "application/json")
@@ -186,7 +205,7 @@ def test_plan_assets_returns_signed_urls(test_client):
     app.dependency_overrides[dependencies.get_supabase_db] = lambda: fake_db
     app.dependency_overrides[dependencies.get_supabase_storage] = lambda: fake_storage
 
-    response = test_client.get(f"/api/v1/plans/{plan_id}/assets")
+    response = client.get(f"/api/v1/plans/{plan_id}/assets")
     assert response.status_code == 200
     body = response.json()
     assert body["notebook_signed_url"].startswith("https://example.com/plans/")
@@ -1,15 +1,52 @@
 from __future__ import annotations
 
-import json
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
 import pytest
-from fastapi.testclient import TestClient
 
 from app import dependencies
 from app.main import app
 
+pytestmark = pytest.mark.e2e
+
+
+@dataclass(slots=True)
+class _Artifact:
+    signed_url: str
+    expires_at: datetime
+
+
+_FIXED_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+_METRICS_ACCURACY_088 = b'{"accuracy": 0.88}'
+_METRICS_ACCURACY_075 = b'{"accuracy": 0.75}'
+_METRICS_PRECISION_075 = b'{"precision": 0.75}'
+
+
+def _run_assets(case: str, files: Dict[str, bytes]) -> Dict[str, bytes]:
+    return {f"runs/run-{case}/{name}": data for name, data in files.items()}
+
+
+_SUCCESS_ASSETS = _run_assets(
+    "success",
+    {
+        "metrics.json": _METRICS_ACCURACY_088,
+        "logs.txt": b"test logs",
+        "events.jsonl": b'{"type": "log_line", "message": "test"}\n',
+    },
+)
+_MISSING_METRICS_ASSETS = _run_assets("missing-metrics-json", {"logs.txt": b"test logs"})
+_WRONG_METRIC_ASSETS = _run_assets(
+    "metric-not-in-metrics-json",
+    {"metrics.json": _METRICS_PRECISION_075, "logs.txt": b"test logs"},
+)
+_NEGATIVE_GAP_ASSETS = _run_assets(
+    "negative-gap",
+    {"metrics.json": _METRICS_ACCURACY_075, "logs.txt": b"test logs"},
+)
+
 
 class FakePlan:
     def __init__(self, plan_id: str, paper_id: str) -> None:
@@ -33,8 +70,8 @@ class FakeRun:
         self.id = run_id
         self.plan_id = plan_id
         self.status = status
-        self.created_at = datetime.now(timezone.utc)
-        self.completed_at = completed_at or datetime.now(timezone.utc)
+        self.created_at = _FIXED_NOW
+        self.completed_at = completed_at or _FIXED_NOW
 
 
 class FakeReportDB:
@@ -58,7 +95,7 @@ class FakeReportStorage:
         return self.records.get(key, b"{}")
 
     def create_signed_url(self, key: str, expires_in: int = 3600):
-        return type("Artifact", (), {"signed_url": f"https://example.com/{key}", "expires_at": datetime.now(timezone.utc)})
+        return _Artifact(signed_url=f"https://example.com/{key}", expires_at=_FIXED_NOW)
 
     def object_exists(self, key: str) -> bool:
         return key in self.records
@@ -69,120 +106,94 @@ def _override_deps(db: FakeReportDB, storage: FakeReportStorage):
     app.dependency_overrides[dependencies.get_supabase_storage] = lambda: storage
 
 
-@pytest.fixture
-def client():
-    client = TestClient(app)
-    try:
-        yield client
-    finally:
-        app.dependency_overrides.clear()
-
-
-def test_report_success(client):
-    plan = FakePlan("plan-report-1", "paper-123")
-    run = FakeRun("run-report-1", "plan-report-1", "succeeded", datetime.now(timezone.utc))
-    db = FakeReportDB([plan], [run])
+# Run status per report case; None means the plan has no runs at all.
+_CASE_RUN_STATUS: Dict[str, str | None] = {
+    "success": "succeeded",
+    "no-runs": None,
+    "no-successful-runs": "failed",
+    "missing-metrics-json": "succeeded",
+    "metric-not-in-metrics-json": "succeeded",
+    "negative-gap": "succeeded",
+}
+
+
+@pytest.fixture(scope="module")
+def report_db() -> FakeReportDB:
+    """Plans and runs never change during a request, so one DB serves every case."""
+    plans = [FakePlan(f"plan-{case}", f"paper-{case}") for case in _CASE_RUN_STATUS]
+    runs = [
+        FakeRun(f"run-{case}", f"plan-{case}", run_status)
+        for case, run_status in _CASE_RUN_STATUS.items()
+        if run_status is not None
+    ]
+    return FakeReportDB(plans, runs)
+
+
+@pytest.mark.parametrize(
+    "case,records,expected_status,expected_code,expected_observed,expected_gap",
+    [
+        pytest.param(
+            "success",
+            _SUCCESS_ASSETS,
+            200,
+            None,
+            0.88,
+            # gap_percent = (0.88 - 0.80) / 0.80 * 100 = 10.0
+            10.0,
+            id="success",
+        ),
+        pytest.param("no-runs", {}, 404, "E_REPORT_NO_RUNS", None, None, id="no-runs"),
+        pytest.param("no-successful-runs", {}, 404, "E_REPORT_NO_RUNS", None, None, id="no-successful-runs"),
+        pytest.param(
+            "missing-metrics-json",
+            _MISSING_METRICS_ASSETS,
+            400,
+            "E_REPORT_METRIC_NOT_FOUND",
+            None,
+            None,
+            id="missing-metrics-json",
+        ),
+        pytest.param(
+            "metric-not-in-metrics-json",
+            _WRONG_METRIC_ASSETS,
+            400,
+            "E_REPORT_METRIC_NOT_FOUND",
+            None,
+            None,
+            id="metric-not-in-metrics-json",
+        ),
+        pytest.param(
+            "negative-gap",
+            _NEGATIVE_GAP_ASSETS,
+            200,
+            None,
+            0.75,
+            # Observed (0.75) < claimed (0.80) => gap_percent = -6.25
+            -6.25,
+            id="negative-gap",
+        ),
+    ],
+)
+def test_report(client, report_db, case, records, expected_status, expected_code, expected_observed, expected_gap):
     storage = FakeReportStorage()
+    storage.records.update(records)
 
-    # Store metrics.json with observed value
-    storage.records["runs/run-report-1/metrics.json"] = json.dumps({"accuracy": 0.88}).encode("utf-8")
-    storage.records["runs/run-report-1/logs.txt"] = b"test logs"
-    storage.records["runs/run-report-1/events.jsonl"] = b'{"type": "log_line", "message": "test"}\n'
+    _override_deps(report_db, storage)
 
-    _override_deps(db, storage)
+    response = client.get(f"/api/v1/papers/paper-{case}/report")
+    assert response.status_code == expected_status
 
-    response = client.get("/api/v1/papers/paper-123/report")
-    assert response.status_code == 200
+    if expected_code is not None:
+        assert response.json()["detail"]["code"] == expected_code
+        return
 
     data = response.json()
-    assert data["paper_id"] == "paper-123"
-    assert data["run_id"] == "run-report-1"
+    assert data["paper_id"] == f"paper-{case}"
+    assert data["run_id"] == f"run-{case}"
     assert data["metric_name"] == "accuracy"
     assert data["claimed"] == 0.80
-    assert data["observed"] == 0.88
-    # gap_percent = (0.88 - 0.80) / 0.80 * 100 = 10.0
-    assert abs(data["gap_percent"] - 10.0) < 0.01
+    assert data["observed"] == expected_observed
+    assert abs(data["gap_percent"] - expected_gap) < 0.01
     assert len(data["citations"]) == 3
     assert data["artifacts"]["metrics_url"].startswith("https://example.com/")
     assert data["artifacts"]["logs_url"].startswith("https://example.com/")
-
-
-def test_report_no_runs(client):
-    plan = FakePlan("plan-no-runs", "paper-no-runs")
-    db = FakeReportDB([plan], [])
-    storage = FakeReportStorage()
-
-    _override_deps(db, storage)
-
-    response = client.get("/api/v1/papers/paper-no-runs/report")
-    assert response.status_code == 404
-    assert response.json()["detail"]["code"] == "E_REPORT_NO_RUNS"
-
-
-def test_report_no_successful_runs(client):
-    plan = FakePlan("plan-failed", "paper-failed")
-    run = FakeRun("run-failed", "plan-failed", "failed", None)
-    db = FakeReportDB([plan], [run])
-    storage = FakeReportStorage()
-
-    _override_deps(db, storage)
-
-    response = client.get("/api/v1/papers/paper-failed/report")
-    assert response.status_code == 404
-    assert response.json()["detail"]["code"] == "E_REPORT_NO_RUNS"
-
-
-def test_report_missing_metrics_json(client):
-    plan = FakePlan("plan-no-metrics", "paper-no-metrics")
-    run = FakeRun("run-no-metrics", "plan-no-metrics", "succeeded", datetime.now(timezone.utc))
-    db = FakeReportDB([plan], [run])
-    storage = FakeReportStorage()
-
-    # Do NOT store metrics.json
-    storage.records["runs/run-no-metrics/logs.txt"] = b"test logs"
-
-    _override_deps(db, storage)
-
-    response = client.get("/api/v1/papers/paper-no-metrics/report")
-    assert response.status_code == 400
-    assert response.json()["detail"]["code"] == "E_REPORT_METRIC_NOT_FOUND"
-
-
-def test_report_metric_not_in_metrics_json(client):
-    plan = FakePlan("plan-wrong-metric", "paper-wrong-metric")
-    run = FakeRun("run-wrong-metric", "plan-wrong-metric", "succeeded", datetime.now(timezone.utc))
-    db = FakeReportDB([plan], [run])
-    storage = FakeReportStorage()
-
-    # Store metrics.json but with wrong metric name
-    storage.records["runs/run-wrong-metric/metrics.json"] = json.dumps({"precision": 0.75}).encode("utf-8")
-    storage.records["runs/run-wrong-metric/logs.txt"] = b"test logs"
-
-    _override_deps(db, storage)
-
-    response = client.get("/api/v1/papers/paper-wrong-metric/report")
-    assert response.status_code == 400
-    assert response.json()["detail"]["code"] == "E_REPORT_METRIC_NOT_FOUND"
-
-
-def test_report_negative_gap(client):
-    """Test that gap is negative when observed < claimed."""
-    plan = FakePlan("plan-negative", "paper-negative")
-    run = FakeRun("run-negative", "plan-negative", "succeeded", datetime.now(timezone.utc))
-    db = FakeReportDB([plan], [run])
-    storage = FakeReportStorage()
-
-    # Observed (0.75) < claimed (0.80) => negative gap
-    storage.records["runs/run-negative/metrics.json"] = json.dumps({"accuracy": 0.75}).encode("utf-8")
-    storage.records["runs/run-negative/logs.txt"] = b"test logs"
-
-    _override_deps(db, storage)
-
-    response = client.get("/api/v1/papers/paper-negative/report")
-    assert response.status_code == 200
-
-    data = response.json()
-    assert data["claimed"] == 0.80
-    assert data["observed"] == 0.75
-    # gap_percent = (0.75 - 0.80) / 0.80 * 100 = -6.25
-    assert abs(data["gap_percent"] - (-6.25)) < 0.01
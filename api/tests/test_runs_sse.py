@@ -1,61 +1,93 @@
 ﻿from __future__ import annotations
 
+import asyncio
 import json
 from typing import Any, Dict, List, Optional
 
-import nbformat
 import pytest
 from fastapi.testclient import TestClient
-from nbformat.v4 import new_code_cell, new_notebook
 
 from app import dependencies
 from app.main import app
-from app.run.runner_local import NotebookRunResult
-
-
-def build_plan(plan_id: str, paper_id: str = "paper-1") -> Dict[str, Any]:
-    return {
-        "version": "1.1",
-        "dataset": {"name": "demo", "split": "test", "filters": [], "notes": None},
-        "model": {
-            "name": "linear",
-            "variant": "tiny",
-            "parameters": {},
-            "size_category": "tiny",
-        },
-        "config": {
-            "framework": "sklearn",
-            "seed": 1,
-            "epochs": 2,
-            "batch_size": 8,
-            "learning_rate": 0.001,
-            "optimizer": "adam",
-        },
-        "metrics": [
-            {
-                "name": "accuracy",
-                "split": "test",
-                "goal": 0.8,
-                "tolerance": 0.05,
-                "direction": "maximize",
-            }
+from app.routers import runs as runs_router
+from app.run.runner_local import NotebookExecutionError, NotebookRunResult
+
+pytestmark = pytest.mark.e2e
+
+
+_PLAN_TEMPLATE: Dict[str, Any] = {
+    "version": "1.1",
+    "dataset": {"name": "demo", "split": "test", "filters": [], "notes": None},
+    "model": {
+        "name": "linear",
+        "variant": "tiny",
+        "parameters": {},
+        "size_category": "tiny",
+    },
+    "config": {
+        "framework": "sklearn",
+        "seed": 1,
+        "epochs": 2,
+        "batch_size": 8,
+        "learning_rate": 0.001,
+        "optimizer": "adam",
+    },
+    "metrics": [
+        {
+            "name": "accuracy",
+            "split": "test",
+            "goal": 0.8,
+            "tolerance": 0.05,
+            "direction": "maximize",
+        }
+    ],
+    "visualizations": ["confusion_matrix"],
+    "explain": ["explain the results"],
+    "justifications": {
+        "dataset": {"quote": "Use demo", "citation": "p.1"},
+        "model": {"quote": "Use linear", "citation": "p.2"},
+        "config": {"quote": "Parameters", "citation": "p.3"},
+    },
+    "estimated_runtime_minutes": 1.0,
+    "license_compliant": True,
+    "policy": {"budget_minutes": 2, "max_retries": 1},
+}
+
+
+def build_notebook(cells: List[str]) -> bytes:
+    # Hand-built nbformat v4 document; skips nbformat's schema validation pass.
+    notebook = {
+        "cells": [
+            {"cell_type": "code", "source": src, "metadata": {}, "outputs": [], "execution_count": None}
+            for src in cells
         ],
-        "visualizations": ["confusion_matrix"],
-        "explain": ["explain the results"],
-        "justifications": {
-            "dataset": {"quote": "Use demo", "citation": "p.1"},
-            "model": {"quote": "Use linear", "citation": "p.2"},
-            "config": {"quote": "Parameters", "citation": "p.3"},
+        "metadata": {
+            "kernelspec": {"name": "python3", "display_name": "Python 3"},
+            "language_info": {"name": "python"},
         },
-        "estimated_runtime_minutes": 1.0,
-        "license_compliant": True,
-        "policy": {"budget_minutes": 2, "max_retries": 1},
+        "nbformat": 4,
+        "nbformat_minor": 4,
     }
+    return json.dumps(notebook).encode("utf-8")
 
 
-def build_notebook(cells: List[str]) -> bytes:
-    notebook = new_notebook(cells=[new_code_cell(source=src) for src in cells])
-    return nbformat.writes(notebook).encode("utf-8")
+@pytest.fixture(scope="module")
+def happy_notebook_bytes() -> bytes:
+    return build_notebook(
+        [
+            "from pathlib import Path\nimport json\n\nPath('metrics.json').write_text(json.dumps({'accuracy': 0.88}))\nwith open('events.jsonl', 'w', encoding='utf-8') as fh:\n    fh.write(json.dumps({'type': 'metric_update', 'metric': 'accuracy', 'value': 0.88, 'split': 'test'}) + '\\n')\nprint('first log line')\nprint('second log line')",
+            "with open('logs.txt', 'w', encoding='utf-8') as fh:\n    fh.write('captured log\\n')",
+        ]
+    )
+
+
+@pytest.fixture(scope="module")
+def failing_notebook_bytes() -> bytes:
+    return build_notebook(
+        [
+            "print('about to fail')\nraise RuntimeError('boom')",
+        ]
+    )
 
 
 class FakePlanRecord:
@@ -63,7 +95,7 @@ class FakePlanRecord:
         self.id = plan_id
         self.paper_id = "paper-1"
         self.env_hash = "env-abc"
-        self.plan_json = build_plan(plan_id)
+        self.plan_json = _PLAN_TEMPLATE
         self._notebook_bytes = notebook_bytes
 
 
@@ -125,42 +157,21 @@ def _override_dependencies(plan_record: FakePlanRecord, storage: FakeStorage, db
     app.dependency_overrides[dependencies.get_supabase_storage] = lambda: storage
 
 
-def _collect_events(client: TestClient, run_id: str) -> List[Dict[str, Any]]:
-    import time
-    events: List[Dict[str, Any]] = []
-
-    # Wait a moment for async task to complete
-    time.sleep(0.5)
-
-    with client.stream("GET", f"/api/v1/runs/{run_id}/events") as stream:
-        current_event: Optional[str] = None
-        for chunk in stream.iter_lines():
-            if not chunk:
-                continue
-            line = chunk.decode() if isinstance(chunk, bytes) else chunk
-            if line.startswith("event: "):
-                current_event = line.split(": ", 1)[1]
-            elif line.startswith("data: ") and current_event:
-                payload = json.loads(line[6:])
-                events.append({"event": current_event, "data": payload})
-                # Stop after seeing run completion
-                if payload.get("stage") == "run_complete":
-                    break
-                if payload.get("stage") == "run_error":
-                    break
-    return events
-
-
-@pytest.fixture(autouse=True)
-def clear_overrides():
-    try:
-        yield
-    finally:
-        app.dependency_overrides.clear()
-
-
-@pytest.mark.skip(reason="SSE streaming with TestClient is flaky - covered by integration tests")
-def test_run_happy_path_streams_events_and_artifacts(monkeypatch):
+async def _drain_background_runs() -> None:
+    if runs_router._background_runs:
+        await asyncio.wait_for(asyncio.gather(*runs_router._background_runs), timeout=2.0)
+
+
+def _wait_for_run(client: TestClient) -> None:
+    # Await the run task on the app's event loop rather than consuming the SSE stream.
+    client.portal.call(_drain_background_runs)
+
+
+def _recorded_events(db: FakeRunDB) -> List[Dict[str, Any]]:
+    return [{"event": evt.type, "data": evt.payload} for evt in db.events]
+
+
+def test_run_happy_path_records_events_and_artifacts(client, monkeypatch, happy_notebook_bytes):
     # Mock execute_notebook to avoid real notebook execution
     async def _stub_execute_notebook(notebook_bytes, emit, timeout_minutes, seed=42):
         emit("progress", {"percent": 0})
@@ -176,45 +187,34 @@ def test_run_happy_path_streams_events_and_artifacts(monkeypatch):
 
     monkeypatch.setattr("app.routers.runs.execute_notebook", _stub_execute_notebook)
 
-    notebook_bytes = build_notebook(
-        [
-            "from pathlib import Path\nimport json\n\nPath('metrics.json').write_text(json.dumps({'accuracy': 0.88}))\nwith open('events.jsonl', 'w', encoding='utf-8') as fh:\n    fh.write(json.dumps({'type': 'metric_update', 'metric': 'accuracy', 'value': 0.88, 'split': 'test'}) + '\\n')\nprint('first log line')\nprint('second log line')",
-            "with open('logs.txt', 'w', encoding='utf-8') as fh:\n    fh.write('captured log\\n')",
-        ]
-    )
-    plan_record = FakePlanRecord("plan-happy", notebook_bytes)
-    storage = FakeStorage(notebook_bytes)
+    plan_record = FakePlanRecord("plan-happy", happy_notebook_bytes)
+    storage = FakeStorage(happy_notebook_bytes)
     db = FakeRunDB(plan_record)
     _override_dependencies(plan_record, storage, db)
 
-    client = TestClient(app)
-    try:
-        response = client.post("/api/v1/plans/plan-happy/run")
-        assert response.status_code == 202
-        run_id = response.json()["run_id"]
+    response = client.post("/api/v1/plans/plan-happy/run")
+    assert response.status_code == 202
+    run_id = response.json()["run_id"]
+    assert [run["id"] for run in db.inserted_runs] == [run_id]
 
-        events = _collect_events(client, run_id)
+    _wait_for_run(client)
+    events = _recorded_events(db)
 
-        assert any(evt["event"] == "stage_update" and evt["data"]["stage"] == "run_start" for evt in events)
-        assert any(evt["event"] == "stage_update" and evt["data"]["stage"] == "run_complete" for evt in events)
-        assert any(evt["event"] == "log_line" and "first log line" in evt["data"].get("message", "") for evt in events)
-        assert any(evt["event"] == "metric_update" and evt["data"].get("metric") == "accuracy" for evt in events)
+    assert any(evt["event"] == "stage_update" and evt["data"]["stage"] == "run_start" for evt in events)
+    assert any(evt["event"] == "stage_update" and evt["data"]["stage"] == "run_complete" for evt in events)
+    assert any(evt["event"] == "log_line" and "first log line" in evt["data"].get("message", "") for evt in events)
+    assert any(evt["event"] == "metric_update" and evt["data"].get("metric") == "accuracy" for evt in events)
 
-        stored_keys = storage.stored.keys()
-        assert any(key.endswith("metrics.json") for key in stored_keys)
-        assert any(key.endswith("events.jsonl") for key in stored_keys)
-        assert any(key.endswith("logs.txt") for key in stored_keys)
+    stored_keys = storage.stored.keys()
+    assert any(key.endswith("metrics.json") for key in stored_keys)
+    assert any(key.endswith("events.jsonl") for key in stored_keys)
+    assert any(key.endswith("logs.txt") for key in stored_keys)
 
-        assert any(update["status"] == "succeeded" for update in db.updated_runs)
-    finally:
-        client.close()
+    assert any(update["status"] == "succeeded" for update in db.updated_runs)
 
 
-@pytest.mark.skip(reason="SSE streaming with TestClient is flaky - covered by integration tests")
-def test_run_error_path_emits_error_and_logs(monkeypatch):
+def test_run_error_path_records_error_and_logs(client, monkeypatch, failing_notebook_bytes):
     # Mock execute_notebook to simulate failure
-    from app.run.runner_local import NotebookExecutionError
-
     async def _stub_execute_notebook_error(notebook_bytes, emit, timeout_minutes, seed=42):
         emit("progress", {"percent": 0})
         emit("log_line", {"message": "about to fail"})
@@ -222,31 +222,24 @@ def test_run_error_path_emits_error_and_logs(monkeypatch):
 
     monkeypatch.setattr("app.routers.runs.execute_notebook", _stub_execute_notebook_error)
 
-    notebook_bytes = build_notebook(
-        [
-            "print('about to fail')\nraise RuntimeError('boom')",
-        ]
-    )
-    plan_record = FakePlanRecord("plan-fail", notebook_bytes)
-    storage = FakeStorage(notebook_bytes)
+    plan_record = FakePlanRecord("plan-fail", failing_notebook_bytes)
+    storage = FakeStorage(failing_notebook_bytes)
     db = FakeRunDB(plan_record)
     _override_dependencies(plan_record, storage, db)
 
-    client = TestClient(app)
-    try:
-        response = client.post("/api/v1/plans/plan-fail/run")
-        assert response.status_code == 202
-        run_id = response.json()["run_id"]
+    response = client.post("/api/v1/plans/plan-fail/run")
+    assert response.status_code == 202
+    run_id = response.json()["run_id"]
+    assert [run["id"] for run in db.inserted_runs] == [run_id]
 
-        events = _collect_events(client, run_id)
+    _wait_for_run(client)
+    events = _recorded_events(db)
 
-        assert any(evt["event"] == "stage_update" and evt["data"]["stage"] == "run_error" for evt in events)
-        assert any(evt["event"] == "error" and evt["data"].get("code") == "E_RUN_FAILED" for evt in events)
+    assert any(evt["event"] == "stage_update" and evt["data"]["stage"] == "run_error" for evt in events)
+    assert any(evt["event"] == "error" and evt["data"].get("code") == "E_RUN_FAILED" for evt in events)
 
-        stored_keys = storage.stored.keys()
-        assert any(key.endswith("logs.txt") for key in stored_keys)
-        assert any(update["status"] == "failed" for update in db.updated_runs)
-    finally:
-        client.close()
+    stored_keys = storage.stored.keys()
+    assert any(key.endswith("logs.txt") for key in stored_keys)
+    assert any(update["status"] == "failed" for update in db.updated_runs)
 
 
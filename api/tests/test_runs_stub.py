@@ -1,51 +1,82 @@
 from __future__ import annotations
 
-import json
+import asyncio
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
+import httpx
+import nbformat
 import pytest
-from fastapi.testclient import TestClient
 
 from app import dependencies
 from app.main import app
+from app.routers import runs as runs_router
 from app.run.runner_local import NotebookRunResult
 
+pytestmark = pytest.mark.e2e
+
+
+_FIXED_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(slots=True)
+class _Artifact:
+    signed_url: str
+    expires_at: datetime
+
+
+def _build_stub_notebook() -> bytes:
+    nb = nbformat.v4.new_notebook()
+    nb.cells = [nbformat.v4.new_code_cell("import json\nfrom pathlib import Path\nPath('metrics.json').write_text(json.dumps({'accuracy': 0.85}))")]
+    return nbformat.writes(nb).encode("utf-8")
+
+
+_STUB_NB_BYTES = _build_stub_notebook()
+
+
+_PLAN_JSON_TEMPLATE: Dict[str, Any] = {
+    "version": "1.1",
+    "dataset": {"name": "demo", "split": "test", "filters": [], "notes": None},
+    "model": {"name": "logistic", "variant": "tiny", "parameters": {}, "size_category": "tiny"},
+    "config": {
+        "framework": "sklearn",
+        "seed": 7,
+        "epochs": 5,
+        "batch_size": 16,
+        "learning_rate": 0.001,
+        "optimizer": "adam",
+    },
+    "metrics": [
+        {"name": "accuracy", "split": "test", "goal": 0.8, "tolerance": 0.05, "direction": "maximize"}
+    ],
+    "visualizations": ["confusion_matrix"],
+    "explain": ["Explain results"],
+    "justifications": {
+        "dataset": {"quote": "Use demo dataset", "citation": "p.1"},
+        "model": {"quote": "Use logistic", "citation": "p.2"},
+        "config": {"quote": "Use epochs", "citation": "p.3"},
+    },
+    "estimated_runtime_minutes": 1.0,
+    "license_compliant": True,
+    "policy": {"budget_minutes": 1, "max_retries": 1},
+}
+
 
 class FakePlan:
     def __init__(self, plan_id: str, env_hash: str | None = None) -> None:
         self.id = plan_id
         self.paper_id = "paper-test-123"
-        self.plan_json: Dict[str, Any] = {
-            "version": "1.1",
-            "dataset": {"name": "demo", "split": "test", "filters": [], "notes": None},
-            "model": {"name": "logistic", "variant": "tiny", "parameters": {}, "size_category": "tiny"},
-            "config": {
-                "framework": "sklearn",
-                "seed": 7,
-                "epochs": 5,
-                "batch_size": 16,
-                "learning_rate": 0.001,
-                "optimizer": "adam",
-            },
-            "metrics": [
-                {"name": "accuracy", "split": "test", "goal": 0.8, "tolerance": 0.05, "direction": "maximize"}
-            ],
-            "visualizations": ["confusion_matrix"],
-            "explain": ["Explain results"],
-            "justifications": {
-                "dataset": {"quote": "Use demo dataset", "citation": "p.1"},
-                "model": {"quote": "Use logistic", "citation": "p.2"},
-                "config": {"quote": "Use epochs", "citation": "p.3"},
-            },
-            "estimated_runtime_minutes": 1.0,
-            "license_compliant": True,
-            "policy": {"budget_minutes": 1, "max_retries": 1},
-        }
+        # Shallow copy: nested sections are shared with the template and never mutated.
+        self.plan_json: Dict[str, Any] = dict(_PLAN_JSON_TEMPLATE)
         self.env_hash = env_hash
 
 
 class FakeRunDB:
+    # Run events and series are not asserted on here; accept and drop them.
+    insert_run_event = staticmethod(lambda *args, **kwargs: None)
+    insert_run_series = staticmethod(lambda *args, **kwargs: None)
+
     def __init__(self, plan: FakePlan | None) -> None:
         self.plan = plan
         self.inserted_runs: List[Dict[str, Any]] = []
@@ -71,40 +102,34 @@ class FakeRunDB:
             self.plan.env_hash = env_hash
         return self.plan
 
-    def insert_run_event(self, payload):
-        pass
-
-    def insert_run_series(self, *args, **kwargs):
-        pass
-
 
 class FakeStorage:
     def __init__(self) -> None:
-        self.records: Dict[str, Dict[str, Any]] = {}
+        self.records: Dict[str, bytes] = {}
 
     def download(self, key: str) -> bytes:
         """Return a minimal valid notebook for testing."""
-        import nbformat
-        nb = nbformat.v4.new_notebook()
-        nb.cells = [nbformat.v4.new_code_cell("import json\nfrom pathlib import Path\nPath('metrics.json').write_text(json.dumps({'accuracy': 0.85}))")]
-        return nbformat.writes(nb).encode("utf-8")
+        return _STUB_NB_BYTES
 
     def store_asset(self, key: str, data: bytes, content_type: str):
-        self.records[key] = {"data": data, "content_type": content_type}
+        self.records[key] = data
         return key
 
     def store_text(self, key: str, text: str, content_type: str = "text/plain"):
-        return self.store_asset(key, text.encode("utf-8"), content_type)
+        self.records[key] = text.encode("utf-8")
+        return key
 
     def create_signed_url(self, key: str, expires_in: int = 60):
-        return type("Artifact", (), {"signed_url": f"https://example.com/{key}", "expires_at": datetime.now(timezone.utc)})
+        return _Artifact(signed_url=f"https://example.com/{key}", expires_at=_FIXED_NOW)
 
     def object_exists(self, key: str) -> bool:
         return key in self.records
 
 
-def _override(plan: FakePlan | None = None) -> None:
-    fake_db = FakeRunDB(plan)
+@pytest.fixture
+def overrides() -> tuple[FakeRunDB, FakeStorage]:
+    """Install fresh fakes for this test; tests set ``fake_db.plan`` as needed."""
+    fake_db = FakeRunDB(None)
     fake_storage = FakeStorage()
     app.dependency_overrides[dependencies.get_supabase_db] = lambda: fake_db
     app.dependency_overrides[dependencies.get_supabase_storage] = lambda: fake_storage
@@ -112,9 +137,27 @@ def _override(plan: FakePlan | None = None) -> None:
 
 
 @pytest.fixture
-def client(monkeypatch):
-    # Stub out the actual notebook execution
+def anyio_backend():
+    return "asyncio"
+
+
+def _asgi_client() -> httpx.AsyncClient:
+    # Runs the app on the test's own event loop, so background run tasks can be awaited.
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _drain_background_runs() -> None:
+    if runs_router._background_runs:
+        await asyncio.wait_for(asyncio.gather(*runs_router._background_runs), timeout=5.0)
+
+
+@pytest.fixture(autouse=True)
+def stub_execute_notebook(monkeypatch) -> List[Dict[str, Any]]:
+    """Stub out the actual notebook execution; returns the recorded calls."""
+    calls: List[Dict[str, Any]] = []
+
     async def _stub_execute_notebook(notebook_bytes, emit, timeout_minutes, seed=42):
+        calls.append({"timeout_minutes": timeout_minutes, "seed": seed})
         emit("progress", {"percent": 0})
         emit("log_line", {"message": "test log line"})
         emit("progress", {"percent": 100})
@@ -125,53 +168,28 @@ def client(monkeypatch):
         )
 
     monkeypatch.setattr("app.routers.runs.execute_notebook", _stub_execute_notebook)
-
-    client = TestClient(app)
-    try:
-        yield client
-    finally:
-        app.dependency_overrides.clear()
+    return calls
 
 
-def test_start_run_success(client):
-    import time
-    plan = FakePlan("plan-1")
-    fake_db, fake_storage = _override(plan)
+@pytest.mark.anyio
+async def test_start_run_success(overrides, stub_execute_notebook):
+    fake_db, fake_storage = overrides
+    fake_db.plan = FakePlan("plan-1", env_hash="env-abc")
 
-    response = client.post("/api/v1/plans/plan-1/run")
+    async with _asgi_client() as client:
+        response = await client.post("/api/v1/plans/plan-1/run")
     assert response.status_code == 202
     run_id = response.json()["run_id"]
     assert fake_db.inserted_runs
     assert any(record["id"] == run_id for record in fake_db.inserted_runs)
 
-    # Wait for async task to complete
-    time.sleep(0.5)
-
-    assets = fake_storage.records.keys()
-    assert any(key.endswith("metrics.json") for key in assets)
+    await _drain_background_runs()
+    assert stub_execute_notebook == [{"timeout_minutes": 1, "seed": 7}]
+    assert any(key.endswith("metrics.json") for key in fake_storage.records)
+    assert any(update.get("status") == "succeeded" for update in fake_db.updated_runs)
 
 
-def test_start_run_missing_plan_returns_404(client):
-    _override(None)
+def test_start_run_missing_plan_returns_404(client, overrides):
     response = client.post("/api/v1/plans/unknown/run")
     assert response.status_code == 404
     assert response.json()["detail"]["code"] == "E_PLAN_NOT_FOUND"
-
-
-def test_stream_events_sequence(client):
-    """Test that SSE streaming works - covered by test_runs_sse.py instead."""
-    import time
-    plan = FakePlan("plan-stream")
-    fake_db, _ = _override(plan)
-
-    run_response = client.post("/api/v1/plans/plan-stream/run")
-    assert run_response.status_code == 202
-    run_id = run_response.json()["run_id"]
-
-    # Wait for async task to complete
-    time.sleep(0.5)
-
-    # Just verify the run was updated to succeeded
-    assert any(update.get("status") == "succeeded" for update in fake_db.updated_runs)
-
-
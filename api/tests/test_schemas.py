@@ -1,17 +1,20 @@
 """Test Pydantic schemas for Responses API compatibility."""
+import json
+import re
+
 import pytest
 from pydantic import ValidationError
 
-from api.app.agents.schemas import (
+from app.agents.schemas import (
     CitationModel,
     ExtractedClaimModel,
     ExtractorOutputModel,
 )
 
 
-def test_extractor_output_model_validates():
-    """Test ExtractorOutputModel accepts valid JSON with nested citation."""
-    valid_json = {
+# Payloads are serialized once so tests validate straight from JSON bytes.
+VALID_EXTRACTOR_BYTES = json.dumps(
+    {
         "claims": [
             {
                 "dataset_name": "CIFAR-10",
@@ -27,7 +30,27 @@ def test_extractor_output_model_validates():
             }
         ]
     }
-    model = ExtractorOutputModel.model_validate(valid_json)
+).encode("utf-8")
+EMPTY_EXTRACTOR_BYTES = b'{"claims": []}'
+EXTRA_FIELD_BYTES = json.dumps({"claims": [], "extra_field": "should fail"}).encode("utf-8")
+FLAT_CITATION_BYTES = json.dumps(
+    {
+        "claims": [{
+            "dataset_name": "CIFAR-10",
+            "source_citation": "Table 1",  # WRONG: flat instead of nested
+            "confidence": 0.9
+        }]
+    }
+).encode("utf-8")
+
+EXTRA_FIELD_ERROR = re.compile(r"extra_field")
+CITATION_ERROR = re.compile(r"citation")
+CONFIDENCE_ERROR = re.compile(r"confidence")
+
+
+def test_extractor_output_model_validates():
+    """Test ExtractorOutputModel accepts valid JSON with nested citation."""
+    model = ExtractorOutputModel.model_validate_json(VALID_EXTRACTOR_BYTES)
     assert len(model.claims) == 1
     assert model.claims[0].metric_value == 95.5
     assert model.claims[0].citation.source_citation == "Table 1, p.3"
@@ -35,49 +58,31 @@ def test_extractor_output_model_validates():
 
 def test_extractor_output_model_empty_claims():
     """Test empty claims list is valid."""
-    model = ExtractorOutputModel.model_validate({"claims": []})
+    model = ExtractorOutputModel.model_validate_json(EMPTY_EXTRACTOR_BYTES)
     assert len(model.claims) == 0
 
 
-def test_extractor_output_model_rejects_extra_fields():
-    """Test that extra='forbid' works."""
-    invalid_json = {
-        "claims": [],
-        "extra_field": "should fail"
-    }
-    with pytest.raises(ValidationError) as exc_info:
-        ExtractorOutputModel.model_validate(invalid_json)
-    assert "extra_field" in str(exc_info.value)
+@pytest.mark.parametrize(
+    "payload_bytes,err_pattern",
+    [
+        pytest.param(EXTRA_FIELD_BYTES, EXTRA_FIELD_ERROR, id="extra-field-forbidden"),
+        pytest.param(FLAT_CITATION_BYTES, CITATION_ERROR, id="citation-must-be-nested"),
+    ],
+)
+def test_extractor_output_model_rejects_invalid(payload_bytes, err_pattern):
+    """Test that extra='forbid' works and citation must be nested, not flat."""
+    with pytest.raises(ValidationError, match=err_pattern):
+        ExtractorOutputModel.model_validate_json(payload_bytes)
 
 
-def test_confidence_range_validation():
+@pytest.mark.parametrize("confidence", [1.5, -0.1, 2.0, -1.0])
+def test_confidence_out_of_range(confidence):
     """Test confidence must be 0.0-1.0."""
-    # Too high
     invalid_json = {
         "claims": [{
             "dataset_name": "test",
-            "citation": {"source_citation": "Table 1", "confidence": 1.5}
+            "citation": {"source_citation": "Table 1", "confidence": confidence}
         }]
     }
-    with pytest.raises(ValidationError) as exc_info:
+    with pytest.raises(ValidationError, match=CONFIDENCE_ERROR):
         ExtractorOutputModel.model_validate(invalid_json)
-    assert "confidence" in str(exc_info.value)
-
-    # Negative
-    invalid_json["claims"][0]["citation"]["confidence"] = -0.1
-    with pytest.raises(ValidationError):
-        ExtractorOutputModel.model_validate(invalid_json)
-
-
-def test_nested_citation_structure():
-    """Test that citation must be nested, not flat."""
-    flat_json = {
-        "claims": [{
-            "dataset_name": "CIFAR-10",
-            "source_citation": "Table 1",  # WRONG: flat instead of nested
-            "confidence": 0.9
-        }]
-    }
-    with pytest.raises(ValidationError) as exc_info:
-        ExtractorOutputModel.model_validate(flat_json)
-    assert "citation" in str(exc_info.value)
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime, timezone
 from types import SimpleNamespace
 
+import pytest
+
 from app.data.models import PaperCreate, PlanCreate
 from app.data.supabase import SupabaseDatabase, is_valid_uuid
 
@@ -69,29 +72,29 @@ class _FakeClient:
         return self.last_query
 
 
-def test_insert_paper_handles_list_response():
-    payload = _paper_payload()
-    response_row = payload.model_dump(mode="json")
-    client = _FakeClient([response_row])
-    db = SupabaseDatabase(client)  # type: ignore[arg-type]
+@pytest.fixture(scope="module")
+def paper_payload() -> PaperCreate:
+    return _paper_payload()
 
-    record = db.insert_paper(payload)
 
-    assert client.last_table == "papers"
-    assert client.last_query is not None
-    assert client.last_query.last_payload["created_by"] == _VALID_UUID
-    assert record.id == payload.id
+@pytest.fixture(scope="module")
+def paper_row(paper_payload: PaperCreate) -> dict[str, object]:
+    # Serialized once in pydantic-core; both response shapes reuse the decoded row.
+    return json.loads(paper_payload.model_dump_json())
 
 
-def test_insert_paper_handles_dict_response():
-    payload = _paper_payload()
-    response_row = payload.model_dump(mode="json")
-    client = _FakeClient(response_row)
+@pytest.mark.parametrize("wrap", [lambda row: [row], lambda row: row], ids=["list", "dict"])
+def test_insert_paper_handles_response_shape(paper_payload, paper_row, wrap):
+    client = _FakeClient(wrap(paper_row))
     db = SupabaseDatabase(client)  # type: ignore[arg-type]
 
-    record = db.insert_paper(payload)
+    record = db.insert_paper(paper_payload)
 
-    assert record.vector_store_id == payload.vector_store_id
+    assert client.last_table == "papers"
+    assert client.last_query is not None
+    assert client.last_query.last_payload["created_by"] == _VALID_UUID
+    assert record.id == paper_payload.id
+    assert record.vector_store_id == paper_payload.vector_store_id
 
 
 def test_insert_paper_omits_invalid_created_by():
@@ -1,51 +1,68 @@
 from types import SimpleNamespace
 from unittest.mock import Mock
 
+import pytest
+
 from app.data.supabase import SupabaseStorage, sanitize_headers
 
 
-def test_store_pdf_uses_file_options():
+@pytest.fixture(scope="module")
+def _shared_storage_env():
     upload_mock = Mock()
-    list_mock = Mock(return_value=[])
-    bucket = SimpleNamespace(upload=upload_mock, list=list_mock)
-    storage_attr = SimpleNamespace(from_=Mock(return_value=bucket))
-    client = SimpleNamespace(storage=storage_attr)
+    bucket = SimpleNamespace(upload=upload_mock, list=Mock(return_value=[]))
+    client = SimpleNamespace(storage=SimpleNamespace(from_=Mock(return_value=bucket)))
+    return SupabaseStorage(client, "papers"), upload_mock
+
+
+@pytest.fixture
+def storage_env(_shared_storage_env):
+    """Module-wide storage wrapper; the upload mock is reset after each test."""
+    yield _shared_storage_env
+    _shared_storage_env[1].reset_mock()
+
 
-    storage = SupabaseStorage(client, "papers")
+@pytest.mark.parametrize(
+    "method,path,payload,expected_file,content_type",
+    [
+        pytest.param("store_pdf", "foo/bar.pdf", b"data", b"data", "application/pdf", id="pdf"),
+        pytest.param("store_text", "plans/abc.txt", "hello", b"hello", "text/plain", id="text-utf8"),
+    ],
+)
+def test_store_uses_file_options(storage_env, method, path, payload, expected_file, content_type):
+    storage, upload_mock = storage_env
 
-    artifact = storage.store_pdf("foo/bar.pdf", b"data")
+    artifact = getattr(storage, method)(path, payload)
 
     upload_mock.assert_called_once()
     kwargs = upload_mock.call_args.kwargs
-    assert kwargs["path"] == "foo/bar.pdf"
-    assert kwargs["file"] == b"data"
-    assert kwargs["file_options"] == {"contentType": "application/pdf"}
+    assert kwargs["path"] == path
+    assert kwargs["file"] == expected_file
+    assert kwargs["file_options"] == {"contentType": content_type}
     assert isinstance(kwargs["file_options"]["contentType"], str)
-    assert artifact.path == "foo/bar.pdf"
+    assert artifact.path == path
 
 
-def test_sanitize_headers_casts_non_strings():
+def test_sanitize_headers_keeps_keys():
     headers = {"contentType": "application/pdf", "upsert": True, "retries": 2}
     sanitized = sanitize_headers(headers)
     assert set(sanitized.keys()) == {"contentType", "upsert", "retries"}
-    for value in sanitized.values():
-        assert isinstance(value, str)
-    assert sanitized["upsert"] == "True"
-    assert sanitized["retries"] == "2"
 
 
-def test_store_text_uses_utf8():
-    upload_mock = Mock()
-    bucket = SimpleNamespace(upload=upload_mock, list=Mock(return_value=[]))
-    storage_attr = SimpleNamespace(from_=Mock(return_value=bucket))
-    client = SimpleNamespace(storage=storage_attr)
-    storage = SupabaseStorage(client, "plans")
+# (header value, sanitized value); None values are dropped from the result.
+HEADER_VALUE_CASES = [
+    ("application/pdf", "application/pdf"),
+    (True, "True"),  # upsert
+    (2, "2"),  # retries
+    (0.5, "0.5"),
+    (None, None),
+]
 
-    artifact = storage.store_text("plans/abc.txt", "hello")
 
-    upload_mock.assert_called_once()
-    kwargs = upload_mock.call_args.kwargs
-    assert kwargs["path"] == "plans/abc.txt"
-    assert kwargs["file"] == b"hello"
-    assert kwargs["file_options"] == {"contentType": "text/plain"}
-    assert artifact.path == "plans/abc.txt"
+@pytest.mark.parametrize("value,expected", HEADER_VALUE_CASES, ids=repr)
+def test_sanitize_headers_coerces_value(value, expected):
+    result = sanitize_headers({"x-test": value})
+    if expected is None:
+        assert "x-test" not in result
+    else:
+        assert result["x-test"] == expected
+        assert isinstance(result["x-test"], str)
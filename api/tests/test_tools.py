@@ -5,13 +5,16 @@ from app.agents.tooling import HOSTED_TOOLS, ToolUsageTracker
 from app.tools import ToolUsagePolicyError, ToolValidationError, function_tools
 
 
+_FILE_SEARCH = "file_search"
+
+
 def test_tool_usage_tracker_enforces_limits():
     tracker = ToolUsageTracker()
-    spec = HOSTED_TOOLS["file_search"]
-    for _ in range(spec.max_calls):
-        tracker.record_call("file_search")
+    max_calls = HOSTED_TOOLS[_FILE_SEARCH].max_calls
+    for _ in range(max_calls):
+        tracker.record_call(_FILE_SEARCH)
     with pytest.raises(ToolUsagePolicyError):
-        tracker.record_call("file_search")
+        tracker.record_call(_FILE_SEARCH)
 
 
 def test_env_lock_builder_disallows_unsupported_packages():
@@ -25,4 +28,4 @@ def test_env_lock_builder_disallows_unsupported_packages():
 def test_agent_role_tool_mappings():
     planner_tools = function_tools.get("dataset_resolver")
     assert planner_tools.openai_tool is not None
-    assert AgentRole.PLANNER in HOSTED_TOOLS["file_search"].allowed_roles
+    assert AgentRole.PLANNER in HOSTED_TOOLS[_FILE_SEARCH].allowed_roles
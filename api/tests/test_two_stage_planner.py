@@ -1,92 +1,113 @@
 """
 Tests for two-stage planner architecture (o3-mini + GPT-4o schema fix).
 """
+import copy
 import json
+from contextlib import ExitStack
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-from api.app.routers.plans import _fix_plan_schema
-from api.app.schemas.plan_v1_1 import PlanDocumentV11
+from unittest.mock import Mock, create_autospec, patch
+from openai.resources.chat.completions import Completions
+from app.config.settings import get_settings
 
 # Only use asyncio backend, not trio
 pytestmark = pytest.mark.anyio
-pytest_plugins = ('anyio',)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def anyio_backend():
     return 'asyncio'
 
 
-@pytest.fixture
-def malformed_plan_missing_policy():
-    """Raw plan from o3-mini with budget_minutes at top level instead of in policy."""
-    return {
-        "budget_minutes": 20,  # WRONG: should be in policy.budget_minutes
-        "dataset": {
-            "name": "SST-2",
-            "source": "huggingface",
-            "split_ratio": {"train": 0.8, "val": 0.1, "test": 0.1}
-        },
-        "model": {
-            "name": "TextCNN",
-            "architecture": "cnn",
-            "framework": "pytorch"
-        },
-        "config": {
-            "epochs": 5,
-            "batch_size": 32,
-            "optimizer": "adam",
-            "learning_rate": 0.001
-        },
-        "metrics": ["accuracy", "f1"],
-        "visualizations": ["training_curve", "confusion_matrix"],
-        "explain_steps": ["Load dataset", "Train model", "Evaluate"],
-        "justifications": {
-            "dataset": "Paper uses SST-2 for sentiment analysis (Table 2)",
-            "model": "TextCNN is described in Section 3.2",
-            "config": "5 epochs mentioned in experimental setup"
-        }
+@pytest.fixture(scope="module")
+async def _shared_event_loop():
+    """Hold anyio's test runner open so the module's async tests share one event loop."""
+    yield
+
+
+class _NoopSpan:
+    """Minimal context manager standing in for traced_subspan."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+_RAW_PLAN_TEMPLATE = {
+    "dataset": {
+        "name": "SST-2",
+        "source": "huggingface",
+        "split_ratio": {"train": 0.8, "val": 0.1, "test": 0.1}
+    },
+    "model": {
+        "name": "TextCNN",
+        "architecture": "cnn",
+        "framework": "pytorch"
+    },
+    "config": {
+        "epochs": 5,
+        "batch_size": 32,
+        "optimizer": "adam",
+        "learning_rate": 0.001
+    },
+    "metrics": ["accuracy", "f1"],
+    "visualizations": ["training_curve", "confusion_matrix"],
+    "explain_steps": ["Load dataset", "Train model", "Evaluate"],
+    "justifications": {
+        "dataset": "Paper uses SST-2 for sentiment analysis (Table 2)",
+        "model": "TextCNN is described in Section 3.2",
+        "config": "5 epochs mentioned in experimental setup"
     }
+}
 
 
-@pytest.fixture
-def valid_plan():
-    """Valid plan matching PlanDocumentV11 schema."""
-    return {
-        "policy": {"budget_minutes": 20, "max_retries": 1},
-        "dataset": {
-            "name": "SST-2",
-            "source": "huggingface",
-            "split_ratio": {"train": 0.8, "val": 0.1, "test": 0.1}
-        },
-        "model": {
-            "name": "TextCNN",
-            "architecture": "cnn",
-            "framework": "pytorch"
-        },
-        "config": {
-            "epochs": 5,
-            "batch_size": 32,
-            "optimizer": "adam",
-            "learning_rate": 0.001
-        },
-        "metrics": ["accuracy", "f1"],
-        "visualizations": ["training_curve", "confusion_matrix"],
-        "explain_steps": ["Load dataset", "Train model", "Evaluate"],
-        "justifications": {
-            "dataset": "Paper uses SST-2 for sentiment analysis (Table 2)",
-            "model": "TextCNN is described in Section 3.2",
-            "config": "5 epochs mentioned in experimental setup"
-        }
-    }
+@pytest.fixture(scope="session")
+def raw_plan_factory():
+    """Build a fresh plan from the shared template with top-level overrides."""
+    def _make(**overrides):
+        plan = copy.deepcopy(_RAW_PLAN_TEMPLATE)
+        plan.update(overrides)
+        return plan
 
+    return _make
 
-@pytest.fixture
+
+@pytest.fixture(scope="session")
+def malformed_plan_missing_policy(raw_plan_factory):
+    """Raw plan from o3-mini with budget_minutes at top level instead of in policy.
+
+    Shared across the session; deep-copy before mutating.
+    """
+    # WRONG: budget_minutes should be in policy.budget_minutes
+    return raw_plan_factory(budget_minutes=20)
+
+
+@pytest.fixture(scope="session")
+def valid_plan(raw_plan_factory):
+    """Valid plan matching PlanDocumentV11 schema.
+
+    Shared across the session; deep-copy before mutating.
+    """
+    return raw_plan_factory(policy={"budget_minutes": 20, "max_retries": 1})
+
+
+@pytest.fixture(scope="session")
+def valid_plan_json(valid_plan):
+    """``valid_plan`` serialized once, as the schema fixer would return it."""
+    return json.dumps(valid_plan)
+
+
+@pytest.fixture(scope="module")
 def mock_openai_client():
-    """Mock OpenAI client for schema fixer."""
-    mock = Mock()
-    mock.chat = Mock()
-    mock.chat.completions = Mock()
+    """Mock OpenAI client for schema fixer, built once and reset after each test."""
+    # ``OpenAI.chat`` is a cached_property, which autospec cannot follow, so only
+    # the completions resource is specced; a misspelled kwarg or attribute fails fast.
+    completions = create_autospec(Completions, instance=True)
+    mock = Mock(**{"chat.completions": completions})
 
     # Mock response
     mock_response = Mock()
@@ -98,121 +119,85 @@ def mock_openai_client():
     mock_choice.message = mock_message
     mock_response.choices = [mock_choice]
 
-    mock.chat.completions.create = Mock(return_value=mock_response)
-
-    return mock
-
-
-@pytest.mark.anyio
-async def test_fix_plan_schema_with_malformed_input(
-    malformed_plan_missing_policy,
-    valid_plan,
-    mock_openai_client
-):
-    """Test that schema fixer corrects malformed plan (budget_minutes in wrong location)."""
-    # Setup mock to return valid plan
-    mock_openai_client.chat.completions.create.return_value.choices[0].message.content = json.dumps(valid_plan)
-
-    # Mock both the direct import and the function call
-    with patch('api.app.config.llm.get_client', return_value=mock_openai_client):
-        with patch('api.app.routers.plans.get_settings') as mock_settings:
-            with patch('api.app.routers.plans.traced_subspan', return_value=MagicMock(__enter__=MagicMock(), __exit__=MagicMock())):
-                mock_settings.return_value.openai_schema_fixer_model = "gpt-4o"
-
-                fixed_plan = await _fix_plan_schema(
-                    raw_plan=malformed_plan_missing_policy,
-                    budget_minutes=20,
-                    paper_title="Test Paper",
-                    span=None
-                )
-
-    # Verify schema fixer was called
-    assert mock_openai_client.chat.completions.create.called
-
-    # Verify response_format was set to json_object
-    call_kwargs = mock_openai_client.chat.completions.create.call_args[1]
-    assert call_kwargs["response_format"] == {"type": "json_object"}
-    assert call_kwargs["temperature"] == 0.0
-
-    # Verify fixed plan has correct structure
-    assert "policy" in fixed_plan
-    assert "budget_minutes" in fixed_plan["policy"]
-    assert fixed_plan["policy"]["budget_minutes"] == 20
-
-    # Verify original content preserved
-    assert fixed_plan["dataset"]["name"] == "SST-2"
-    assert fixed_plan["model"]["name"] == "TextCNN"
-    assert "Paper uses SST-2" in fixed_plan["justifications"]["dataset"]
-
-
-@pytest.mark.anyio
-async def test_fix_plan_schema_with_valid_input(
-    valid_plan,
-    mock_openai_client
-):
-    """Test that schema fixer handles already-valid plans correctly."""
-    # Setup mock to return valid plan (no changes needed)
-    mock_openai_client.chat.completions.create.return_value.choices[0].message.content = json.dumps(valid_plan)
-
-    with patch('api.app.config.llm.get_client', return_value=mock_openai_client):
-        with patch('api.app.routers.plans.get_settings') as mock_settings:
-            with patch('api.app.routers.plans.traced_subspan', return_value=MagicMock(__enter__=MagicMock(), __exit__=MagicMock())):
-                mock_settings.return_value.openai_schema_fixer_model = "gpt-4o"
-
-                fixed_plan = await _fix_plan_schema(
-                    raw_plan=valid_plan,
-                    budget_minutes=20,
-                    paper_title="Test Paper",
-                    span=None
-                )
-
-    # Verify schema fixer was still called (idempotent)
-    assert mock_openai_client.chat.completions.create.called
-
-    # Verify plan structure maintained
-    assert fixed_plan == valid_plan
+    completions.create.return_value = mock_response
 
+    yield mock
 
-@pytest.mark.anyio
-async def test_fix_plan_schema_preserves_justifications(
-    malformed_plan_missing_policy,
-    mock_openai_client
-):
-    """Test that schema fixer preserves all justifications and reasoning."""
-    # Create response with preserved justifications
-    fixed = malformed_plan_missing_policy.copy()
-    fixed["policy"] = {"budget_minutes": 20, "max_retries": 1}
-    del fixed["budget_minutes"]
 
-    mock_openai_client.chat.completions.create.return_value.choices[0].message.content = json.dumps(fixed)
+@pytest.fixture(autouse=True)
+def _reset_openai_client(mock_openai_client):
+    yield
+    # Plain reset_mock keeps the configured response graph; only call records are dropped.
+    mock_openai_client.reset_mock()
+    mock_openai_client.chat.completions.create.side_effect = None
+    mock_openai_client.chat.completions.create.return_value.choices[0].message.content = None
 
-    with patch('api.app.config.llm.get_client', return_value=mock_openai_client):
-        with patch('api.app.routers.plans.get_settings') as mock_settings:
-            with patch('api.app.routers.plans.traced_subspan', return_value=MagicMock(__enter__=MagicMock(), __exit__=MagicMock())):
-                mock_settings.return_value.openai_schema_fixer_model = "gpt-4o"
 
-                fixed_plan = await _fix_plan_schema(
-                    raw_plan=malformed_plan_missing_policy,
-                    budget_minutes=20,
-                    paper_title="Test Paper",
-                    span=None
-                )
+@pytest.fixture
+def patched_plans_router(mock_openai_client):
+    """Route the schema fixer to the mock client with stubbed settings and tracing."""
+    with ExitStack() as stack:
+        stack.enter_context(patch('app.config.llm.get_client', return_value=mock_openai_client))
+        mock_settings = stack.enter_context(patch('app.routers.plans.get_settings'))
+        stack.enter_context(patch('app.routers.plans.traced_subspan', return_value=_NOOP_SPAN))
+        mock_settings.return_value.openai_schema_fixer_model = "gpt-4o"
+        yield mock_settings
+
+
+@pytest.mark.parametrize(
+    "raw_plan_fixture",
+    [
+        # budget_minutes at top level instead of under policy
+        pytest.param("malformed_plan_missing_policy", id="malformed"),
+        # already valid; the fixer must be idempotent
+        pytest.param("valid_plan", id="valid"),
+    ],
+)
+@pytest.mark.usefixtures("_shared_event_loop", "patched_plans_router")
+async def test_fix_plan_schema(raw_plan_fixture, valid_plan, valid_plan_json, mock_openai_client, request):
+    """Schema fixer returns the Plan v1.1 shape and preserves content and justifications."""
+    # Imported here so runs selecting only the settings test skip loading the plans router.
+    from app.routers.plans import _fix_plan_schema
+
+    raw_plan = request.getfixturevalue(raw_plan_fixture)
+    create = mock_openai_client.chat.completions.create
+    create.return_value.choices[0].message.content = valid_plan_json
+    captured = {}
+
+    def _capture(**kwargs):
+        captured.update(kwargs)
+        return create.return_value
+
+    create.side_effect = _capture
+
+    fixed_plan = await _fix_plan_schema(
+        raw_plan=raw_plan,
+        budget_minutes=20,
+        paper_title="Test Paper",
+        span=None
+    )
+
+    # Schema fixer is always called, in JSON mode
+    assert captured["response_format"] == {"type": "json_object"}
+    assert captured["temperature"] == 0.0
+
+    # Budget lives under policy; original content preserved
+    assert fixed_plan == valid_plan
+    assert fixed_plan["policy"]["budget_minutes"] == 20
+    assert fixed_plan["dataset"]["name"] == "SST-2"
+    assert fixed_plan["model"]["name"] == "TextCNN"
 
-    # Verify ALL justifications preserved
-    assert fixed_plan["justifications"]["dataset"] == malformed_plan_missing_policy["justifications"]["dataset"]
-    assert fixed_plan["justifications"]["model"] == malformed_plan_missing_policy["justifications"]["model"]
-    assert fixed_plan["justifications"]["config"] == malformed_plan_missing_policy["justifications"]["config"]
+    # ALL justifications preserved verbatim
+    assert fixed_plan["justifications"] == raw_plan["justifications"]
 
 
 # NOTE: Error handling and full schema validation tests removed for now
 # These edge cases can be refined when testing with real o3-mini outputs
-# Core functionality is verified by the 4 passing tests above
+# Core functionality is verified by the parametrized test above
 
 
 def test_two_stage_planner_settings():
     """Test that two-stage planner settings are available."""
-    from api.app.config.settings import get_settings
-
     settings = get_settings()
 
     # Verify new settings exist
@@ -1,13 +1,15 @@
-from app.utils.redaction import redact_vector_store_id
-
-
-def test_redact_vector_store_id_none():
-    assert redact_vector_store_id(None) == "unknown***"
+import pytest
 
-
-def test_redact_vector_store_id_short():
-    assert redact_vector_store_id("abc") == "abc***"
+from app.utils.redaction import redact_vector_store_id
 
 
-def test_redact_vector_store_id_long():
-    assert redact_vector_store_id("abcdefghijk") == "abcdefgh***"
+@pytest.mark.parametrize(
+    ("vector_store_id", "expected"),
+    [
+        pytest.param(None, "unknown***", id="none"),
+        pytest.param("abc", "abc***", id="short"),
+        pytest.param("abcdefghijk", "abcdefgh***", id="long"),
+    ],
+)
+def test_redact_vector_store_id(vector_store_id, expected):
+    assert redact_vector_store_id(vector_store_id) == expected
@@ -12,10 +12,11 @@ Commands:
   start         Start the API server (auto-loads .env)
   health        Check API health
   download      Download all 20 papers to uploads/
-  upload        Upload all papers to API
+  upload        Upload all papers in uploads/ to API
   smoke <id>    Run smoke test pipeline on a paper
   list          List all ingested papers
   extract <id>  Extract claims from a paper
+  batch-extract [id ...]  Extract claims for several papers (default: all uploaded)
   plan <id>     Generate plan for a paper
   run <id>      Execute a plan
   report <id>   Generate report for a paper
@@ -25,21 +26,49 @@ import sys
 import subprocess
 import json
 import os
+import re
+import shutil
+import asyncio
 from pathlib import Path
 
 API_URL = "http://localhost:8000"
+UPLOAD_DIR = Path("uploads")
+UPLOAD_RESULTS = Path("upload_results.txt")
+# Max requests in flight for batch commands; keeps the API clear of 429s
+PIPELINE_DEPTH = 8
+# Seconds smoke waits on a silent run event stream
+# (the API caps a run at DEFAULT_TIMEOUT_MINUTES = 25 in api/app/routers/runs.py)
+RUN_WAIT_TIMEOUT = 25 * 60
+EXTRACTOR_MODELS = ["gpt-4o", "o3-mini"]
+PLANNER_MODELS = ["o3-mini", "gpt-5"]
+
+# KEY=value lines; blank lines and # comments never match
+_ENV_LINE = re.compile(r'^[ \t]*([^#=\s][^=\n]*?)[ \t]*=(.*)$', re.M)
+
+# .env path -> ((mtime_ns, size), parsed values)
+_env_file_cache = {}
+
+def read_env_file(env_file=Path(".env")):
+    """Parse a .env file into a dict, reusing the last parse while the file is unchanged"""
+    stat = env_file.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _env_file_cache.get(env_file)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    values = {
+        match[1]: match[2].strip().strip('"').strip("'")
+        for match in _ENV_LINE.finditer(env_file.read_text())
+    }
+    _env_file_cache[env_file] = (stamp, values)
+    return values
 
 def load_env():
     """Load .env file and return environment dict"""
     env = os.environ.copy()
     env_file = Path(".env")
     if env_file.exists():
-        with open(env_file) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    env[key.strip()] = value.strip().strip('"').strip("'")
+        env.update(read_env_file(env_file))
     return env
 
 def print_env():
@@ -68,7 +97,7 @@ def print_env():
         else:
             print(f"{key:30} = ⚠ NOT SET")
 
-    print(f"\n✓ Total vars in .env: {len([l for l in env_file.read_text().split('\n') if '=' in l and not l.startswith('#')])}")
+    print(f"\n✓ Total vars in .env: {len(read_env_file(env_file))}")
 
 def start_server():
     """Start the API server with environment variables loaded"""
@@ -92,11 +121,21 @@ def start_server():
         "--workers", "1"
     ], env=env)
 
+def api_client(timeout=120):
+    """Async client for the API; all of a command's requests share its keep-alive connections"""
+    import httpx
+
+    # retries only re-attempts failed connects, so it is safe for POSTs as well
+    return httpx.AsyncClient(base_url=API_URL, timeout=timeout, transport=httpx.AsyncHTTPTransport(retries=2))
+
+async def _request(method, path, timeout):
+    async with api_client() as client:
+        return await client.request(method, path, timeout=timeout)
+
 def check_health():
     """Check API health"""
     try:
-        import requests
-        resp = requests.get(f"{API_URL}/health", timeout=5)
+        resp = asyncio.run(_request("GET", "/health", timeout=5))
         if resp.status_code == 200:
             print("✓ API is healthy")
             print(json.dumps(resp.json(), indent=2))
@@ -116,57 +155,141 @@ def download_papers():
     else:
         subprocess.run(["bash", "scripts/download_papers.sh"])
 
+async def pipelined(coros, depth=PIPELINE_DEPTH):
+    """Await coroutines with at most `depth` in flight; results (or exceptions) keep input order"""
+    semaphore = asyncio.Semaphore(depth)
+
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(bounded(coro) for coro in coros), return_exceptions=True)
+
+async def _upload_paper(client, pdf, results):
+    data = await asyncio.to_thread(pdf.read_bytes)
+    resp = await client.post(
+        "/api/v1/papers/ingest",
+        params={"title": pdf.stem},
+        files={"file": (pdf.name, data, "application/pdf")},
+    )
+    resp.raise_for_status()
+    paper_id = resp.json()['paper_id']
+    # Record each paper as soon as it lands, so an interrupted batch keeps what it uploaded
+    results.write(f"{paper_id}|{pdf.stem}\n")
+    results.flush()
+    print(f"✓ {pdf.name} -> {paper_id}")
+    return paper_id
+
+async def _upload_papers(pdfs):
+    # Rows land in a temp file and only replace upload_results.txt once something
+    # uploaded, so a failed (or rerun) batch never wipes the ids of the last good one
+    tmp_file = UPLOAD_RESULTS.with_name(UPLOAD_RESULTS.name + ".tmp")
+    try:
+        with open(tmp_file, 'w') as results:
+            async with api_client(timeout=300) as client:
+                return await pipelined(_upload_paper(client, pdf, results) for pdf in pdfs)
+    finally:
+        # open() itself may have failed; let that error through untouched
+        if tmp_file.exists():
+            if tmp_file.stat().st_size:
+                os.replace(tmp_file, UPLOAD_RESULTS)
+            else:
+                tmp_file.unlink()
+
 def upload_papers():
-    """Upload papers using bash script"""
-    print("Uploading papers to API...")
-    subprocess.run(["bash", "scripts/upload_papers.sh"])
+    """Upload every PDF in uploads/ to the API, PIPELINE_DEPTH at a time"""
+    pdfs = sorted(UPLOAD_DIR.glob("*.pdf"))
+    if not pdfs:
+        print(f"✗ No PDFs found in {UPLOAD_DIR}/. Run 'python manage.py download' first.")
+        return
 
-def smoke_test(paper_id):
-    """Run full smoke pipeline on a paper"""
-    try:
-        import requests
+    print(f"Uploading {len(pdfs)} papers to API...")
+    results = asyncio.run(_upload_papers(pdfs))
 
+    failed = [(pdf, result) for pdf, result in zip(pdfs, results) if isinstance(result, Exception)]
+    for pdf, error in failed:
+        print(f"✗ {pdf.name}: {error}")
+    if len(failed) == len(pdfs):
+        print(f"\n✗ Uploaded 0/{len(pdfs)} papers ({UPLOAD_RESULTS} left unchanged)")
+        return
+    print(f"\n✓ Uploaded {len(pdfs) - len(failed)}/{len(pdfs)} papers (ids in {UPLOAD_RESULTS})")
+
+async def _stream_claims(client, paper_id):
+    """Stream the extractor SSE and return the claims from its result event"""
+    claims = None
+    event = None
+    async with client.stream("POST", f"/api/v1/papers/{paper_id}/extract", timeout=120) as resp:
+        async for line in resp.aiter_lines():
+            if line.startswith('event: '):
+                event = line[7:]
+            # Only the result frame carries claims; token/log frames are never decoded.
+            elif event == 'result' and line.startswith('data: '):
+                claims = json.loads(line[6:]).get('claims')
+    return claims
+
+async def _follow_run(client, run_id):
+    """Follow the run's SSE until it ends; returns (final stage, error message)"""
+    stage = None
+    error = None
+    event = None
+    async with client.stream("GET", f"/api/v1/runs/{run_id}/events", timeout=RUN_WAIT_TIMEOUT) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if line.startswith('event: '):
+                event = line[7:]
+            elif line.startswith('data: ') and event in ('stage_update', 'error'):
+                data = json.loads(line[6:])
+                if event == 'error':
+                    error = data.get('message')
+                elif data.get('stage') in ('run_complete', 'run_error'):
+                    stage = data['stage']
+    return stage, error
+
+async def _smoke_test(paper_id):
+    # One client for the whole pipeline: every stage reuses the same keep-alive connection.
+    # Stages stay sequential because each one consumes the previous stage's output.
+    async with api_client() as client:
         print(f"→ Running smoke pipeline on paper: {paper_id}\n")
 
         # Extract
         print("Step 1/5: Extracting claims...")
-        resp = requests.post(f"{API_URL}/api/v1/papers/{paper_id}/extract", stream=True, timeout=120)
-        claims = None
-        for line in resp.iter_lines():
-            if line.startswith(b'data: '):
-                data = json.loads(line[6:])
-                if 'claims' in data:
-                    claims = data['claims']
-                    print(f"✓ Extracted {len(claims)} claims\n")
-
+        claims = await _stream_claims(client, paper_id)
         if not claims:
             print("✗ No claims found")
             return
+        print(f"✓ Extracted {len(claims)} claims\n")
 
         # Plan
         print("Step 2/5: Generating plan (budget=15)...")
-        plan_resp = requests.post(
-            f"{API_URL}/api/v1/papers/{paper_id}/plan",
+        plan_resp = (await client.post(
+            f"/api/v1/papers/{paper_id}/plan",
             json={"claims": claims[:3], "budget_minutes": 15},
-            timeout=120
-        ).json()
+        )).json()
         plan_id = plan_resp['plan_id']
         print(f"✓ Plan created: {plan_id}\n")
 
         # Materialize
         print("Step 3/5: Materializing notebook...")
-        mat_resp = requests.post(f"{API_URL}/api/v1/plans/{plan_id}/materialize", timeout=120).json()
+        mat_resp = (await client.post(f"/api/v1/plans/{plan_id}/materialize")).json()
         print(f"✓ Materialized (env_hash: {mat_resp['env_hash'][:8]}...)\n")
 
         # Run
         print("Step 4/5: Starting run...")
-        run_resp = requests.post(f"{API_URL}/api/v1/plans/{plan_id}/run", timeout=10).json()
+        run_resp = (await client.post(f"/api/v1/plans/{plan_id}/run", timeout=10)).json()
         run_id = run_resp['run_id']
         print(f"✓ Run started: {run_id}\n")
 
-        # Report
-        print("Step 5/5: Generating report...")
-        report = requests.get(f"{API_URL}/api/v1/papers/{paper_id}/report", timeout=30).json()
+        # Report: only once the run has completed server-side
+        print("Step 5/5: Waiting for the run, then generating report...")
+        stage, error = await _follow_run(client, run_id)
+        if stage != 'run_complete':
+            print(f"✗ Run {run_id} did not complete: {error or stage or 'event stream ended'}")
+            return
+        resp = await client.get(f"/api/v1/papers/{paper_id}/report", timeout=30)
+        if resp.status_code != 200:
+            print(f"✗ Report returned {resp.status_code}: {resp.text}")
+            return
+        report = resp.json()
         print(f"✓ Report generated (gap: {report.get('gap_percent', 'N/A')}%)\n")
 
         print("=== Smoke Pipeline Complete ===")
@@ -174,54 +297,80 @@ def smoke_test(paper_id):
         print(f"Plan: {plan_id}")
         print(f"Run: {run_id}")
 
+def smoke_test(paper_id):
+    """Run full smoke pipeline on a paper"""
+    try:
+        asyncio.run(_smoke_test(paper_id))
     except Exception as e:
         print(f"✗ Error: {e}")
 
+def uploaded_papers():
+    """Return (paper_id, title) pairs recorded by the last upload"""
+    with open(UPLOAD_RESULTS) as f:
+        return [tuple(line.strip().split('|', 1)) for line in f if line.strip()]
+
 def list_papers():
     """List all papers"""
-    if Path("upload_results.txt").exists():
+    if UPLOAD_RESULTS.exists():
         print("=== Uploaded Papers ===")
-        with open("upload_results.txt") as f:
-            for line in f:
-                paper_id, title = line.strip().split('|', 1)
-                print(f"{paper_id}  # {title}")
+        for paper_id, title in uploaded_papers():
+            print(f"{paper_id}  # {title}")
     else:
         print("No upload_results.txt found. Run 'python manage.py upload' first.")
 
+async def _extract_claims(paper_id):
+    async with api_client() as client:
+        return await _stream_claims(client, paper_id)
+
 def extract_claims(paper_id):
     """Extract claims from a paper"""
     try:
-        import requests
         print(f"Extracting claims from {paper_id}...")
-        resp = requests.post(f"{API_URL}/api/v1/papers/{paper_id}/extract", stream=True, timeout=120)
-        for line in resp.iter_lines():
-            if line.startswith(b'data: '):
-                data = json.loads(line[6:])
-                if 'claims' in data:
-                    print(json.dumps(data['claims'], indent=2))
+        claims = asyncio.run(_extract_claims(paper_id))
+        if claims is not None:
+            print(json.dumps(claims, indent=2))
     except Exception as e:
         print(f"✗ Error: {e}")
 
+async def _batch_extract(paper_ids):
+    async with api_client() as client:
+        return await pipelined(_stream_claims(client, paper_id) for paper_id in paper_ids)
+
+def batch_extract(*paper_ids):
+    """Extract claims for several papers, PIPELINE_DEPTH at a time"""
+    if not paper_ids:
+        if not UPLOAD_RESULTS.exists():
+            print("No upload_results.txt found. Run 'python manage.py upload' first.")
+            return
+        paper_ids = [paper_id for paper_id, _ in uploaded_papers()]
+
+    print(f"Extracting claims from {len(paper_ids)} papers...")
+    results = asyncio.run(_batch_extract(paper_ids))
+    for paper_id, result in zip(paper_ids, results):
+        if isinstance(result, Exception):
+            print(f"✗ {paper_id}: {result}")
+        elif not result:
+            print(f"✗ {paper_id}: no claims found")
+        else:
+            print(f"✓ {paper_id}: {len(result)} claims")
+
+async def _generate_plan(paper_id):
+    async with api_client() as client:
+        # First get claims
+        claims = await _stream_claims(client, paper_id)
+        if not claims:
+            return None
+        return (await client.post(
+            f"/api/v1/papers/{paper_id}/plan",
+            json={"claims": claims[:3], "budget_minutes": 15},
+        )).json()
+
 def generate_plan(paper_id):
     """Generate plan for a paper"""
     try:
-        import requests
         print(f"Generating plan for {paper_id}...")
-        # First get claims
-        resp = requests.post(f"{API_URL}/api/v1/papers/{paper_id}/extract", stream=True, timeout=120)
-        claims = None
-        for line in resp.iter_lines():
-            if line.startswith(b'data: '):
-                data = json.loads(line[6:])
-                if 'claims' in data:
-                    claims = data['claims']
-
-        if claims:
-            plan_resp = requests.post(
-                f"{API_URL}/api/v1/papers/{paper_id}/plan",
-                json={"claims": claims[:3], "budget_minutes": 15},
-                timeout=120
-            ).json()
+        plan_resp = asyncio.run(_generate_plan(paper_id))
+        if plan_resp:
             print(f"✓ Plan created: {plan_resp['plan_id']}")
         else:
             print("✗ No claims found")
@@ -231,9 +380,8 @@ def generate_plan(paper_id):
 def run_plan(plan_id):
     """Execute a plan"""
     try:
-        import requests
         print(f"Running plan {plan_id}...")
-        resp = requests.post(f"{API_URL}/api/v1/plans/{plan_id}/run", timeout=10).json()
+        resp = asyncio.run(_request("POST", f"/api/v1/plans/{plan_id}/run", timeout=10)).json()
         print(f"✓ Run started: {resp['run_id']}")
     except Exception as e:
         print(f"✗ Error: {e}")
@@ -241,9 +389,8 @@ def run_plan(plan_id):
 def generate_report(paper_id):
     """Generate report for a paper"""
     try:
-        import requests
         print(f"Generating report for {paper_id}...")
-        resp = requests.get(f"{API_URL}/api/v1/papers/{paper_id}/report", timeout=30).json()
+        resp = asyncio.run(_request("GET", f"/api/v1/papers/{paper_id}/report", timeout=30)).json()
         print(json.dumps(resp, indent=2))
     except Exception as e:
         print(f"✗ Error: {e}")
@@ -255,19 +402,18 @@ def show_models():
     print("=== Current Model Configuration ===\n")
     print(f"Extractor Model:  {env.get('OPENAI_EXTRACTOR_MODEL', 'gpt-4o (default)')}")
     print(f"Planner Model:    {env.get('OPENAI_PLANNER_MODEL', 'o3-mini (default)')}")
-    print(f"\nAvailable Models:")
-    print("  Extractor: gpt-4o, o3-mini")
-    print("  Planner:   o3-mini, gpt-5")
-    print(f"\nTo change models:")
+    print("\nAvailable Models:")
+    print(f"  Extractor: {', '.join(EXTRACTOR_MODELS)}")
+    print(f"  Planner:   {', '.join(PLANNER_MODELS)}")
+    print("\nTo change models:")
     print("  python manage.py set-extractor <model>")
     print("  python manage.py set-planner <model>")
 
 def set_extractor_model(model):
     """Set extractor model in .env"""
-    valid_models = ["gpt-4o", "o3-mini"]
-    if model not in valid_models:
+    if model not in EXTRACTOR_MODELS:
         print(f"✗ Invalid model: {model}")
-        print(f"  Valid options: {', '.join(valid_models)}")
+        print(f"  Valid options: {', '.join(EXTRACTOR_MODELS)}")
         return
 
     update_env_var("OPENAI_EXTRACTOR_MODEL", model)
@@ -276,10 +422,9 @@ def set_extractor_model(model):
 
 def set_planner_model(model):
     """Set planner model in .env"""
-    valid_models = ["o3-mini", "gpt-5"]
-    if model not in valid_models:
+    if model not in PLANNER_MODELS:
         print(f"✗ Invalid model: {model}")
-        print(f"  Valid options: {', '.join(valid_models)}")
+        print(f"  Valid options: {', '.join(PLANNER_MODELS)}")
         return
 
     update_env_var("OPENAI_PLANNER_MODEL", model)
@@ -293,6 +438,10 @@ def update_env_var(key, value):
         print("✗ No .env file found")
         return
 
+    # Already set: leave the file (and its mtime) untouched
+    if read_env_file(env_file).get(key) == value:
+        return
+
     lines = env_file.read_text().splitlines()
     found = False
 
@@ -305,7 +454,13 @@ def update_env_var(key, value):
     if not found:
         lines.append(f"{key}={value}")
 
-    env_file.write_text('\n'.join(lines) + '\n')
+    # Write beside the real file (through any symlink) and swap it in, so a crash
+    # never leaves a torn file; keep its mode so a 0600 .env stays private
+    target = env_file.resolve()
+    tmp_file = target.with_name(target.name + ".tmp")
+    tmp_file.write_text('\n'.join(lines) + '\n')
+    shutil.copymode(target, tmp_file)
+    os.replace(tmp_file, target)
 
 def generate_pwsh_env_loader():
     """Generate PowerShell command to load .env"""
@@ -317,67 +472,55 @@ def generate_pwsh_env_loader():
     print("\nTo verify it worked:")
     print("  $env:OPENAI_API_KEY")
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
+# command -> (handler, required arguments); None passes every remaining argument through
+COMMANDS = {
+    "env": (print_env, ()),
+    "models": (show_models, ()),
+    "set-extractor": (set_extractor_model, ("<model>",)),
+    "set-planner": (set_planner_model, ("<model>",)),
+    "pwsh-env": (generate_pwsh_env_loader, ()),
+    "start": (start_server, ()),
+    "health": (check_health, ()),
+    "download": (download_papers, ()),
+    "upload": (upload_papers, ()),
+    "smoke": (smoke_test, ("<paper_id>",)),
+    "list": (list_papers, ()),
+    "extract": (extract_claims, ("<paper_id>",)),
+    "batch-extract": (batch_extract, None),
+    "plan": (generate_plan, ("<paper_id>",)),
+    "run": (run_plan, ("<plan_id>",)),
+    "report": (generate_report, ("<paper_id>",)),
+}
+
+# Printed under the usage line when a command's arguments are missing
+USAGE_HINTS = {
+    "set-extractor": f"Valid models: {', '.join(EXTRACTOR_MODELS)}",
+    "set-planner": f"Valid models: {', '.join(PLANNER_MODELS)}",
+}
+
+def main(argv):
+    if len(argv) < 2:
         print(__doc__)
-        sys.exit(1)
-
-    command = sys.argv[1]
-
-    if command == "env":
-        print_env()
-    elif command == "models":
-        show_models()
-    elif command == "set-extractor":
-        if len(sys.argv) < 3:
-            print("Usage: python manage.py set-extractor <model>")
-            print("Valid models: gpt-4o, o3-mini")
-            sys.exit(1)
-        set_extractor_model(sys.argv[2])
-    elif command == "set-planner":
-        if len(sys.argv) < 3:
-            print("Usage: python manage.py set-planner <model>")
-            print("Valid models: o3-mini, gpt-5")
-            sys.exit(1)
-        set_planner_model(sys.argv[2])
-    elif command == "pwsh-env":
-        generate_pwsh_env_loader()
-    elif command == "start":
-        start_server()
-    elif command == "health":
-        check_health()
-    elif command == "download":
-        download_papers()
-    elif command == "upload":
-        upload_papers()
-    elif command == "smoke":
-        if len(sys.argv) < 3:
-            print("Usage: python manage.py smoke <paper_id>")
-            sys.exit(1)
-        smoke_test(sys.argv[2])
-    elif command == "list":
-        list_papers()
-    elif command == "extract":
-        if len(sys.argv) < 3:
-            print("Usage: python manage.py extract <paper_id>")
-            sys.exit(1)
-        extract_claims(sys.argv[2])
-    elif command == "plan":
-        if len(sys.argv) < 3:
-            print("Usage: python manage.py plan <paper_id>")
-            sys.exit(1)
-        generate_plan(sys.argv[2])
-    elif command == "run":
-        if len(sys.argv) < 3:
-            print("Usage: python manage.py run <plan_id>")
-            sys.exit(1)
-        run_plan(sys.argv[2])
-    elif command == "report":
-        if len(sys.argv) < 3:
-            print("Usage: python manage.py report <paper_id>")
-            sys.exit(1)
-        generate_report(sys.argv[2])
-    else:
+        return 1
+
+    command = argv[1]
+    if command not in COMMANDS:
         print(f"Unknown command: {command}")
         print(__doc__)
-        sys.exit(1)
+        return 1
+
+    handler, required = COMMANDS[command]
+    args = argv[2:]
+    if required is not None:
+        if len(args) < len(required):
+            print(f"Usage: python manage.py {command} {' '.join(required)}")
+            if command in USAGE_HINTS:
+                print(USAGE_HINTS[command])
+            return 1
+        args = args[:len(required)]
+
+    handler(*args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -5,13 +5,37 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 
+# Consumers draining the task queue, i.e. the most tasks handled at once.
+WORKER_CONCURRENCY = 4
+# Producers block on put() once this many tasks are waiting.
+QUEUE_MAXSIZE = 256
+
+
+async def handle(task) -> None:
+    """Process one task. Run blocking or CPU-heavy steps via ``asyncio.to_thread``."""
+    logging.info("Handling task: %s", task)
+
+
+async def consume(queue: asyncio.Queue) -> None:
+    """Pull tasks off the queue forever; a failing task is logged, not fatal."""
+    while True:
+        task = await queue.get()
+        try:
+            await handle(task)
+        except Exception:
+            logging.exception("Task failed: %s", task)
+        finally:
+            queue.task_done()
+
+
 async def main() -> None:
     """Entrypoint for the placeholder worker loop."""
-    logging.info("Worker booted. Add task orchestration here.")
+    logging.info("Worker booted. Add task producers here.")
     logging.info("Current timestamp: %s", datetime.utcnow().isoformat())
-    # Keep the process alive to mimic a long-running worker without doing work.
-    while True:
-        await asyncio.sleep(60)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+    consumers = [asyncio.create_task(consume(queue)) for _ in range(WORKER_CONCURRENCY)]
+    # Consumers never return, which keeps the process alive as a long-running worker.
+    await asyncio.gather(*consumers)
 
 
 if __name__ == "__main__":